@@ -0,0 +1,230 @@
+# benchmarks/bench.py
+
+"""
+Benchmarks for the simulation, analysis and plotting hot paths.
+
+Run from the project root:
+
+    python -m benchmarks.bench                      # quick sweep
+    python -m benchmarks.bench --full               # paper-scale sweep (n_firms up to 10k)
+    python -m benchmarks.bench --compare benchmarks/results/baseline.json
+
+Every case records the best wall time over --repeat calls, throughput in
+firm-periods/sec where it applies, and peak traced memory of one extra call.
+Results are written as JSON; --compare flags cases slower than the baseline
+by more than --threshold.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from src.config import ASPIRATION_TYPE, UNCERTAINTY_LEVELS
+from src.simulation import (ResultColumns, compute_peer_perf, compute_peer_perfs,
+                            experiment_cells, run_batched_simulation, run_experiment,
+                            run_single_simulation)
+
+results_dir = Path(__file__).resolve().parent / "results"
+
+STRATEGIES = ["stepwise", "ambitious", "conservative"]
+
+SWEEPS = {
+    "quick": {
+        "n_firms": [50, 200, 1000],
+        "n_periods": [100],
+        "n_runs": [4],
+        "legacy_peer_max_firms": 200,
+        "table_runs": 20,
+        "table_firms": 200,
+    },
+    "full": {
+        "n_firms": [50, 200, 1000, 10_000],
+        "n_periods": [100, 1000],
+        "n_runs": [10, 100],
+        "legacy_peer_max_firms": 1000,
+        "table_runs": 1000,
+        "table_firms": 200,
+    },
+}
+
+
+# ---------- Measurement ----------
+def measure(func, repeat=3, work=None):
+    """Best-of-repeat wall time plus peak traced memory of one more call."""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    best = min(times)
+    result = {"seconds": best, "mean_seconds": float(np.mean(times)), "peak_mb": peak / 2**20}
+    if work is not None:
+        result["firm_periods_per_sec"] = work / best
+    return result
+
+
+def synthetic_results(n_runs, n_firms, seed=0):
+    """Result table of realistic shape filled with random Performance / Risk."""
+    rng = np.random.default_rng(seed)
+    cells = experiment_cells()
+    columns = ResultColumns(cells, "stepwise", n_runs, n_firms)
+    for cell_idx in range(len(cells)):
+        columns.set_cell(cell_idx, rng.normal(0.6, 0.3, (n_runs, n_firms)),
+                         np.abs(rng.normal(0.6, 0.1, (n_runs, n_firms))))
+    return columns.to_frame()
+
+
+# ---------- Cases ----------
+def simulation_cases(sweep):
+    for n_firms in sweep["n_firms"]:
+        for n_periods in sweep["n_periods"]:
+            for strategy in STRATEGIES:
+                params = {"n_firms": n_firms, "n_periods": n_periods, "strategy": strategy}
+                yield ("run_single_simulation", params, n_firms * n_periods,
+                       lambda p=params: run_single_simulation("mixed", 0.9, 0.9, **p))
+                for n_runs in sweep["n_runs"]:
+                    batch = dict(params, n_runs=n_runs)
+                    yield ("run_batched_simulation", batch, n_firms * n_periods * n_runs,
+                           lambda p=batch: run_batched_simulation("mixed", 0.9, 0.9, **p))
+
+
+def peer_cases(sweep):
+    rng = np.random.default_rng(0)
+    for n_firms in sweep["n_firms"]:
+        P = rng.standard_normal(n_firms)
+        for strategy in STRATEGIES:
+            params = {"n_firms": n_firms, "strategy": strategy}
+            yield ("compute_peer_perfs", params, n_firms,
+                   lambda P=P, s=strategy: compute_peer_perfs(P, s))
+            if n_firms <= sweep["legacy_peer_max_firms"]:
+                yield ("compute_peer_perf", params, n_firms,
+                       lambda P=P, s=strategy: [compute_peer_perf(i, P, s) for i in range(len(P))])
+
+
+def experiment_cases(sweep):
+    n_firms, n_periods, n_runs = sweep["n_firms"][0], sweep["n_periods"][0], sweep["n_runs"][0]
+    n_cells = len(ASPIRATION_TYPE) * len(UNCERTAINTY_LEVELS)
+    for batched in (False, True):
+        params = {"n_firms": n_firms, "n_periods": n_periods, "n_runs": n_runs,
+                  "strategy": "stepwise", "batched": batched}
+        yield ("run_experiment", params, n_cells * n_runs * n_firms * n_periods,
+               lambda p=params: run_experiment(**p))
+
+
+def analysis_cases(sweep):
+    from src.analysis import create_table_detailed
+    df = synthetic_results(sweep["table_runs"], sweep["table_firms"])
+    for backend in ("aggregate", "statsmodels"):
+        params = {"rows": len(df), "backend": backend}
+        yield ("create_table_detailed", params, None,
+               lambda b=backend: create_table_detailed(df, backend=b))
+
+
+def plotting_cases(sweep):
+    from src import analysis, plotting
+    df = synthetic_results(sweep["table_runs"], sweep["table_firms"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        anova_df, asp, tech, market = analysis.create_table_detailed(df)
+
+    def render():
+        # keep benchmark figures out of outputs/
+        with tempfile.TemporaryDirectory() as tmp:
+            plotting.plot_results(df, anova_df=anova_df, asp_summary=asp, tech_summary=tech,
+                                  market_summary=market, force=True, directory=tmp)
+
+    yield ("plot_results", {"rows": len(df)}, None, render)
+
+
+GROUPS = {
+    "simulation": simulation_cases,
+    "peers": peer_cases,
+    "experiment": experiment_cases,
+    "analysis": analysis_cases,
+    "plotting": plotting_cases,
+}
+
+
+# ---------- Reporting ----------
+def case_id(name, params):
+    return name + "[" + ",".join(f"{k}={v}" for k, v in params.items()) + "]"
+
+
+def run_benchmarks(groups, sweep_name="quick", repeat=3):
+    sweep = SWEEPS[sweep_name]
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "sweep": sweep_name,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "cases": {},
+    }
+    for group in groups:
+        for name, params, work, func in GROUPS[group](sweep):
+            key = case_id(name, params)
+            result = measure(func, repeat=repeat, work=work)
+            report["cases"][key] = dict(result, group=group, name=name, params=params)
+            rate = result.get("firm_periods_per_sec")
+            rate_txt = f"{rate:,.0f} firm-periods/s" if rate else ""
+            print(f"{key:<90} {result['seconds']:9.4f}s {result['peak_mb']:9.1f} MB  {rate_txt}")
+    return report
+
+
+def compare(report, baseline, threshold=0.1):
+    """List cases that got slower than the baseline by more than threshold (fraction)."""
+    regressions = []
+    for key, case in report["cases"].items():
+        old = baseline.get("cases", {}).get(key)
+        if old is None:
+            continue
+        ratio = case["seconds"] / old["seconds"]
+        if ratio > 1 + threshold:
+            regressions.append((key, old["seconds"], case["seconds"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark simulation, analysis and plotting")
+    parser.add_argument("--full", action="store_true", help="run the paper-scale sweep")
+    parser.add_argument("--groups", nargs="+", choices=list(GROUPS), default=list(GROUPS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="JSON file to write (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown before flagging (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.groups, "full" if args.full else "quick", args.repeat)
+
+    output = args.output or results_dir / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n📁 Benchmark results saved to {output}")
+
+    if args.compare is not None:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.threshold)
+        if regressions:
+            print(f"\n⚠️ {len(regressions)} regression(s) against {args.compare}:")
+            for key, old, new, ratio in regressions:
+                print(f"  {key}: {old:.4f}s -> {new:.4f}s ({ratio:.2f}x)")
+            return 1
+        print(f"\n✅ No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
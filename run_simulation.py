@@ -1,31 +1,24 @@
-# test_run.py
-import numpy as np
-import pandas as pd
-from src.simulation import run_experiment
-from src.analysis import create_table_detailed
+# run_simulation.py
+"""
+Thin wrapper around the command-line interface in src/cli.py.
 
-def main():
-    # 1. Quick view Experiment （aggregated data)
-    print("🚀 Running aggregated simulation...")
-    df_agg = run_experiment(
-        n_firms=NUM_ORG, n_periods=NUM_PERIOD, n_runs=NUM_REPEAT, # from config.py
-        strategy="stepwise", #default,select from ["stepwise","ambitious","conservative"]
-    )
-    print(f"Aggregated data shape: {df_agg.shape}")
-    
-    # 2. Quick view Experiment （Anova)
-    print("\n🚀 Running raw data simulation...")
-    df_raw = run_experiment(
-        n_firms=NUM_ORG, n_periods=NUM_PERIOD, n_runs=NUM_REPEAT, # from config.py
-        strategy="stepwise", #default,select from ["stepwise","ambitious","conservative"]
-    )
-    print(f"Raw data shape: {df_raw.shape}")
-    print(df_raw.head(10))
-    # 3. run Anova
-    print("\n🔬 Running ANOVA Analysis...")
-    anova = create_table_detailed(df_raw)
-    
-    return df_agg,anova
+    python run_simulation.py                         # paper-scale grid, then Table 1 and bootstrap CIs
+    python run_simulation.py --backend numba --progress --profile timings.json
+    python run_simulation.py plot outputs/results.pkl
+
+Without a subcommand the arguments go to `simulate --analyze --bootstrap 2000`, with the
+result cache under cache/ unless --cache-dir is given or the flags rule a cache out.
+"""
+import sys
+from src.cli import main, build_parser, accepts_cache, COMMANDS
+from src.config import BOOTSTRAP_REPLICATES
+from src.cache import cache_dir
 
 if __name__ == "__main__":
-    df_agg, df_raw = main()
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv = ["simulate", "--analyze", "--bootstrap", str(BOOTSTRAP_REPLICATES), *argv]
+        args, _ = build_parser().parse_known_args(argv)
+        if args.cache_dir is None and accepts_cache(args):
+            argv += ["--cache-dir", str(cache_dir)]
+    sys.exit(main(argv))
@@ -0,0 +1,55 @@
+# src/accumulators.py
+
+### streaming summaries of per-period simulation output ###
+
+import numpy as np
+
+class RunningMoments:
+    """Element-wise running mean and variance (Welford's algorithm).
+
+    Keeps only the mean and the sum of squared deviations, so the full
+    period x firm trajectory never has to be held in memory. The first
+    burn_in updates are ignored. dtype sets the precision of the state.
+    """
+    def __init__(self, shape, burn_in=0, dtype=float):
+        if burn_in < 0:
+            raise ValueError("burn_in must be non-negative")
+        self.burn_in = burn_in
+        self.seen = 0   # updates received, including burn-in
+        self.count = 0  # updates included in the moments
+        self._mean = np.zeros(shape, dtype=dtype)
+        self._m2 = np.zeros(shape, dtype=dtype)
+
+    @classmethod
+    def from_state(cls, mean, m2, count, burn_in=0):
+        """Rebuild an accumulator from a mean / M2 computed elsewhere (e.g. a compiled kernel)."""
+        moments = cls(np.shape(mean), burn_in=burn_in)
+        moments._mean[...] = mean
+        moments._m2[...] = m2
+        moments.count = count
+        moments.seen = count + burn_in
+        return moments
+
+    def update(self, x):
+        self.seen += 1
+        if self.seen <= self.burn_in:
+            return
+        self.count += 1
+        delta = x - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (x - self._mean)
+
+    @property
+    def mean(self):
+        if self.count == 0:
+            raise ValueError("no observations after burn-in")
+        return self._mean.copy()
+
+    def var(self, ddof=0):
+        if self.count <= ddof:
+            raise ValueError("not enough observations after burn-in")
+        return self._m2 / (self.count - ddof)
+
+    def std(self, ddof=0):
+        """Standard deviation; ddof=0 matches np.std."""
+        return np.sqrt(self.var(ddof))
@@ -0,0 +1,235 @@
+# src/adaptive.py
+
+### adaptive sequential stopping of replications ###
+
+"""
+Replications are added in batches of seeded (cell, run) units, the same units
+run_experiment(workers=...) simulates, so the first N runs of a cell are
+identical to a fixed-budget run with the same seed. After every batch the
+cell means, the Table 1 group mean differences and the ANOVA F-values are
+updated from running aggregates, and cells stop once they are precise enough:
+
+- criterion="diff", scope="cell": a cell stops when the confidence-interval
+  half-width of its mean Performance and Risk is <= tol.
+- criterion="diff", scope="grid": all cells stop when every Perf_diff /
+  Risk_diff half-width (aspiration, tech and market levels) is <= tol.
+- criterion="f": all cells stop when the effects behind every ANOVA F-value
+  (main effects and interactions of the cell means, sum-to-zero coded) have
+  confidence-interval half-widths <= tol.
+
+Half-widths use run-level means, since firms within a run are not independent.
+They shrink like 1 / sqrt(runs) whatever the size of the effect, unlike the
+F-values themselves, which grow with the runs for real effects.
+"""
+
+import itertools
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from src.config import NUM_REPEAT, SEED
+from src.simulation import experiment_cells, ResultColumns
+from src.parallel import run_cells_parallel
+from src.analysis import FACTORS, METRICS, anova_from_aggregates
+from src.instrumentation import ProgressTracker
+
+
+class CellStats:
+    """Running per-cell statistics: per-firm aggregates and run-level means."""
+
+    def __init__(self, n_cells):
+        self.n = {m: np.zeros(n_cells) for m in METRICS}
+        self.sum = {m: np.zeros(n_cells) for m in METRICS}
+        self.ss = {m: np.zeros(n_cells) for m in METRICS}
+        self.run_means = {m: [[] for _ in range(n_cells)] for m in METRICS}
+
+    def add(self, cell_idx, metric, block):
+        """Merge a (runs, firms) block into the cell (pairwise update of n / sum / SS)."""
+        x = np.ravel(block).astype(float)
+        n_a, n_b = self.n[metric][cell_idx], x.size
+        mean_b = x.mean()
+        delta = mean_b - (self.sum[metric][cell_idx] / n_a if n_a else 0.0)
+        self.ss[metric][cell_idx] += np.sum((x - mean_b) ** 2) + delta ** 2 * n_a * n_b / (n_a + n_b)
+        self.sum[metric][cell_idx] += x.sum()
+        self.n[metric][cell_idx] += n_b
+        self.run_means[metric][cell_idx].extend(np.mean(block, axis=1))
+
+    def aggregates(self, cells):
+        """Cell aggregates in the layout of analysis.cell_aggregates()."""
+        tech, market, _, _, asp = zip(*cells)
+        agg = pd.DataFrame({"Aspiration": asp, "Tech_Uncert_Level": tech,
+                            "Market_Uncert_Level": market, "n": self.n[METRICS[0]].astype(np.int64)})
+        for m in METRICS:
+            agg[f"{m}_sum"] = self.sum[m]
+            agg[f"{m}_ss"] = self.ss[m]
+        return agg
+
+    def cell_precision(self, z):
+        """Mean, run-level sd and CI half-width of every cell's metric means."""
+        out = {}
+        for m in METRICS:
+            means = np.array([np.mean(r) for r in self.run_means[m]])
+            sds = np.array([np.std(r, ddof=1) if len(r) > 1 else np.inf for r in self.run_means[m]])
+            runs = np.array([len(r) for r in self.run_means[m]])
+            out[m] = (means, sds, runs, z * sds / np.sqrt(runs))
+        return out
+
+
+def _diff_precision(cells, cell_prec, z):
+    """CI half-widths of Perf_diff / Risk_diff for every level of every factor."""
+    rows = []
+    for factor in FACTORS:
+        # cells are (tech, market, d, v, asp); map factor -> position in the tuple
+        pos = {"Aspiration": 4, "Tech_Uncert_Level": 0, "Market_Uncert_Level": 1}[factor]
+        levels = sorted({cell[pos] for cell in cells})
+        for level in levels:
+            in_group = np.array([cell[pos] == level for cell in cells])
+            row = {"Factor": factor, "Level": level}
+            for m, label in zip(METRICS, ["Perf", "Risk"]):
+                means, sds, runs, _ = cell_prec[m]
+                # diff = group mean - overall mean, both weighted by rows (runs per cell)
+                w = np.where(in_group, runs / runs[in_group].sum(), 0.0) - runs / runs.sum()
+                row[f"{label}_diff"] = np.sum(w * means)
+                row[f"{label}_diff_halfwidth"] = z * np.sqrt(np.sum(w ** 2 * sds ** 2 / runs))
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _term_precision(cells, cell_prec, z):
+    """Largest CI half-width of the effects of every ANOVA term, per metric.
+
+    The effects of a term are the projection of the cell means onto that
+    term: with k_f levels of factor f, cell j enters the effect at cell i with
+    weight prod over f in term of ([f_i == f_j] - 1/k_f) times prod over the
+    other factors of 1/k_f (a full factorial grid, as experiment_cells()).
+    """
+    pos = {"Aspiration": 4, "Tech_Uncert_Level": 0, "Market_Uncert_Level": 1}
+    same = {f: np.array([[a[pos[f]] == b[pos[f]] for b in cells] for a in cells], dtype=float)
+            for f in FACTORS}
+    k = {f: len({cell[pos[f]] for cell in cells}) for f in FACTORS}
+    rows = []
+    for size in range(1, len(FACTORS) + 1):
+        for term in itertools.combinations(FACTORS, size):
+            W = np.ones((len(cells), len(cells)))
+            for f in FACTORS:
+                W *= same[f] - 1 / k[f] if f in term else 1 / k[f]
+            row = {"Term": ":".join(f"C({f})" for f in term)}
+            for m in METRICS:
+                _, sds, runs, _ = cell_prec[m]
+                row[m] = z * np.sqrt((W ** 2 @ (sds ** 2 / runs)).max())
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def run_adaptive_experiment(n_firms, n_periods, strategy, tol, max_runs=NUM_REPEAT,
+                            batch_runs=50, min_runs=None, criterion="diff", scope="cell",
+                            confidence=0.95, workers=1, seed=SEED, burn_in=0,
+                            cache_dir=None, backend="numpy", progress=None, precision="float64"):
+    """
+    Run the aspiration x uncertainty grid, adding batch_runs replications per
+    active cell until the stopping rule (see module docstring) is met or a
+    cell reaches max_runs.
+
+    Returns (df, report, history): the per-firm result table (cells may have
+    different run counts), one row per cell with its runs, stop reason, stop
+    batch and achieved half-widths, and one row per batch with the group
+    mean differences, their half-widths, the F-values and the half-widths of
+    the ANOVA term effects.
+    """
+    if criterion not in ("diff", "f"):
+        raise ValueError(f"Unknown criterion: {criterion}")
+    if scope not in ("cell", "grid"):
+        raise ValueError(f"Unknown scope: {scope}")
+    min_runs = max(2, batch_runs if min_runs is None else min_runs)
+    z = stats.norm.ppf(0.5 + confidence / 2)
+
+    cells = experiment_cells()
+    n_cells = len(cells)
+    cache = None
+    if cache_dir is not None:
+        from src.cache import ResultCache
+        cache = ResultCache(cache_dir)
+    tracker = ProgressTracker(progress, cells, max_runs) if progress is not None else None
+
+    cell_stats = CellStats(n_cells)
+    blocks = {c: ([], []) for c in range(n_cells)}
+    runs_done = np.zeros(n_cells, dtype=int)
+    reason = [None] * n_cells
+    stopped_at = [None] * n_cells
+    history = []
+    batch = 0
+
+    while any(r is None for r in reason):
+        batch += 1
+        active = [c for c in range(n_cells) if reason[c] is None]
+        ranges = {c: range(runs_done[c], min(runs_done[c] + batch_runs, max_runs)) for c in active}
+        results = run_cells_parallel(cells, n_firms=n_firms, n_periods=n_periods, strategy=strategy,
+                                     n_runs=max_runs, workers=workers, seed=seed, burn_in=burn_in,
+                                     cache=cache, backend=backend, run_ranges=ranges, precision=precision,
+                                     on_unit=tracker.runs_done if tracker else None)
+        for c, (perf, risk) in results.items():
+            blocks[c][0].append(perf)
+            blocks[c][1].append(risk)
+            cell_stats.add(c, "Performance", perf)
+            cell_stats.add(c, "Risk", risk)
+            runs_done[c] += len(perf)
+
+        # --- precision after this batch ---
+        cell_prec = cell_stats.cell_precision(z)
+        diffs = _diff_precision(cells, cell_prec, z)
+        terms = _term_precision(cells, cell_prec, z)
+        agg = cell_stats.aggregates(cells)
+        F = pd.concat({m: anova_from_aggregates(agg, m)["F"].drop("Residual") for m in METRICS})
+        max_diff_hw = diffs[["Perf_diff_halfwidth", "Risk_diff_halfwidth"]].to_numpy().max()
+        max_effect_hw = terms[METRICS].to_numpy().max()
+
+        record = {"batch": batch, "total_runs": int(runs_done.sum()),
+                  "active_cells": len(active), "max_diff_halfwidth": max_diff_hw,
+                  "max_effect_halfwidth": max_effect_hw}
+        for _, row in diffs.iterrows():
+            for col in ["Perf_diff", "Perf_diff_halfwidth", "Risk_diff", "Risk_diff_halfwidth"]:
+                record[f"{row['Factor']}={row['Level']}:{col}"] = row[col]
+        for (metric, source), value in F.items():
+            record[f"F:{metric}:{source}"] = value
+        for _, row in terms.iterrows():
+            for m in METRICS:
+                record[f"{row['Term']}:{m}_halfwidth"] = row[m]
+        history.append(record)
+
+        # --- stopping decisions ---
+        enough = runs_done >= min_runs
+        if criterion == "diff" and scope == "cell":
+            cell_hw = np.maximum(cell_prec["Performance"][3], cell_prec["Risk"][3])
+            converged = [c for c in active if enough[c] and cell_hw[c] <= tol]
+        elif criterion == "diff":
+            converged = active if enough[active].all() and max_diff_hw <= tol else []
+        else:
+            converged = active if enough[active].all() and max_effect_hw <= tol else []
+        for c in converged:
+            reason[c], stopped_at[c] = "converged", batch
+        for c in active:
+            if reason[c] is None and runs_done[c] >= max_runs:
+                reason[c], stopped_at[c] = "max_runs", batch
+
+    # --- outputs ---
+    columns = ResultColumns(cells, strategy, runs_done, n_firms, dtype=np.dtype(precision))
+    for c in range(n_cells):
+        columns.set_cell(c, np.concatenate(blocks[c][0]), np.concatenate(blocks[c][1]))
+    df = columns.to_frame()
+
+    cell_prec = cell_stats.cell_precision(z)
+    tech, market, d, v, asp = zip(*cells)
+    report = pd.DataFrame({
+        "Aspiration": asp, "Tech_Uncert_Level": tech, "Market_Uncert_Level": market,
+        "Runs": runs_done, "Stop_reason": reason, "Stopped_batch": stopped_at,
+        "Perf_mean": cell_prec["Performance"][0], "Perf_halfwidth": cell_prec["Performance"][3],
+        "Risk_mean": cell_prec["Risk"][0], "Risk_halfwidth": cell_prec["Risk"][3],
+    })
+    history = pd.DataFrame(history)
+    # plain records: pandas compares and copies attrs on every derived frame
+    df.attrs["adaptive_report"] = report.to_dict("records")
+
+    print(f"\n📊 Raw data for ANOVA - Shape: {df.shape}")
+    print(f"🛑 Adaptive stopping after {batch} batch(es): "
+          f"{int(runs_done.sum())} of {max_runs * n_cells} runs used")
+    return df, report, history
@@ -1,36 +1,177 @@
+import itertools
 import pandas as pd
 import numpy as np
-import statsmodels.api as sm
-from statsmodels.formula.api import ols
+from scipy import stats
+from src.instrumentation import phase
 
+FACTORS = ["Aspiration", "Tech_Uncert_Level", "Market_Uncert_Level"]
+METRICS = ["Performance", "Risk"]
 
-def create_table_detailed(df):
+
+def _clean(df):
+    df = df.dropna(subset=METRICS)
+    return df.replace([np.inf, -np.inf], np.nan).dropna()
+
+
+def cell_aggregates(df):
     """
-    Produce a Table 1-like summary following Dong (2020):
-    - Reports ANOVA results (without residuals)
-    - Reports group mean differences from the overall mean for Performance & Risk
+    Sufficient statistics of every Aspiration x Tech x Market cell in one groupby pass:
+    count "n", and per metric the sum "<metric>_sum" and the within-cell sum of
+    squared deviations "<metric>_ss". Rows with missing or infinite values are dropped.
+    float32 metric columns are accumulated in float64, one metric at a time.
     """
+    df = _clean(df)
+    grouped = df.groupby(FACTORS, observed=True)
+    agg = pd.DataFrame({"n": grouped.size()})
+    for m in METRICS:
+        if df[m].dtype == np.float64:
+            values = grouped[m]
+        else:
+            values = df[m].astype(np.float64).groupby([df[f] for f in FACTORS], observed=True)
+        agg[f"{m}_sum"] = values.sum()
+        agg[f"{m}_ss"] = values.var(ddof=0) * agg["n"]
+    return agg.reset_index()
 
-    df = df.copy()
-    df = df.dropna(subset=["Performance", "Risk"])
-    df = df.replace([np.inf, -np.inf], np.nan).dropna()
 
-    for col in ["Aspiration", "Tech_Uncert_Level", "Market_Uncert_Level"]:
-        df[col] = df[col].astype("category")
+def _term_columns(agg, term):
+    """Treatment-coded design columns of one (possibly interaction) term over the cells."""
+    dummies = []
+    for factor in term:
+        levels = sorted(agg[factor].unique())  # observed levels only: unused categories add no column
+        dummies.append([(agg[factor] == level).to_numpy(float) for level in levels[1:]])
+    return [np.prod(combo, axis=0) for combo in itertools.product(*dummies)]
 
-    # --- ANOVA ---
-    model_perf = ols(
-        "Performance ~ C(Aspiration)*C(Tech_Uncert_Level)*C(Market_Uncert_Level)",
-        data=df
-    ).fit()
-    anova_perf = sm.stats.anova_lm(model_perf, typ=2)
-    anova_perf["Metric"] = "Performance"
 
-    model_risk = ols(
-        "Risk ~ C(Aspiration)*C(Tech_Uncert_Level)*C(Market_Uncert_Level)",
+def anova_from_aggregates(agg, metric):
+    """
+    Type-II ANOVA of metric ~ C(Aspiration)*C(Tech)*C(Market) from cell aggregates.
+
+    Each model's residual sum of squares is the pooled within-cell SS plus a
+    count-weighted least-squares fit to the cell means, so the cost depends on
+    the number of cells only. Returns the same layout as statsmodels' anova_lm.
+    """
+    n = agg["n"].to_numpy(float)
+    cell_mean = agg[f"{metric}_sum"].to_numpy() / n
+    within_ss = agg[f"{metric}_ss"].sum()
+    sqrt_w = np.sqrt(n)
+
+    terms = [t for k in range(1, len(FACTORS) + 1) for t in itertools.combinations(FACTORS, k)]
+    columns = {t: _term_columns(agg, t) for t in terms}
+
+    def rss(model_terms):
+        X = np.column_stack([np.ones(len(agg))] + [c for t in model_terms for c in columns[t]])
+        beta, *_ = np.linalg.lstsq(X * sqrt_w[:, None], cell_mean * sqrt_w, rcond=None)
+        return within_ss + np.sum(n * (cell_mean - X @ beta) ** 2)
+
+    df_resid = n.sum() - len(agg)
+    rss_full = rss(terms)
+    mse = rss_full / df_resid
+    rows = {}
+    for t in terms:
+        reduced = [u for u in terms if not set(t) <= set(u)]
+        sum_sq = rss(reduced) - rss(reduced + [t])
+        dof = float(len(columns[t]))
+        F = (sum_sq / dof) / mse
+        rows[":".join(f"C({f})" for f in t)] = [sum_sq, dof, F, stats.f.sf(F, dof, df_resid)]
+    rows["Residual"] = [rss_full, df_resid, np.nan, np.nan]
+    return pd.DataFrame.from_dict(rows, orient="index", columns=["sum_sq", "df", "F", "PR(>F)"])
+
+
+def anova_statsmodels(df, metric):
+    """Type-II ANOVA by fitting the full OLS model on every row (cross-check backend)."""
+    import statsmodels.api as sm  # only this backend needs statsmodels, which is slow to import
+    from statsmodels.formula.api import ols
+    df = _clean(df).copy()
+    for col in FACTORS:
+        df[col] = df[col].astype("category").cat.remove_unused_categories()
+    model = ols(
+        f"{metric} ~ C(Aspiration)*C(Tech_Uncert_Level)*C(Market_Uncert_Level)",
         data=df
     ).fit()
-    anova_risk = sm.stats.anova_lm(model_risk, typ=2)
+    return sm.stats.anova_lm(model, typ=2)
+
+
+def compare_backends(df, rtol=1e-8):
+    """
+    Cross-check the aggregate ANOVA against statsmodels on the same data.
+    Returns the largest relative difference in sum_sq / df / F per metric; raises
+    AssertionError if the two backends disagree beyond rtol.
+    """
+    agg = cell_aggregates(df)
+    worst = {}
+    for metric in METRICS:
+        fast = anova_from_aggregates(agg, metric)
+        ref = anova_statsmodels(df, metric).loc[fast.index]
+        diff = 0.0
+        for col in ["sum_sq", "df", "F"]:
+            a, b = fast[col].to_numpy(), ref[col].to_numpy()
+            ok = ~np.isnan(b)
+            diff = max(diff, np.max(np.abs(a[ok] - b[ok]) / np.maximum(np.abs(b[ok]), 1e-300)))
+        assert diff <= rtol, f"{metric}: backends differ by {diff:.3g}"
+        worst[metric] = diff
+    return worst
+
+
+def compare_precision(reference, compact, atol=1e-3, rtol=5e-2):
+    """
+    Accuracy guard for low-precision runs: compare the Table 1 group means
+    (every level of every factor) and ANOVA F-values of a compact (e.g. float32)
+    result table against a float64 reference of the same experiment.
+
+    Returns one row per quantity with both values and their difference; raises
+    AssertionError if a group mean differs by more than atol or an F-value by
+    more than rtol (relative).
+    """
+    agg_ref, agg_new = cell_aggregates(reference), cell_aggregates(compact)
+    rows = []
+    for factor in FACTORS:
+        sums_ref = agg_ref.groupby(factor, observed=True)[["n", "Performance_sum", "Risk_sum"]].sum()
+        sums_new = agg_new.groupby(factor, observed=True)[["n", "Performance_sum", "Risk_sum"]].sum()
+        for level in sums_ref.index:
+            for m in METRICS:
+                ref = sums_ref.loc[level, f"{m}_sum"] / sums_ref.loc[level, "n"]
+                new = sums_new.loc[level, f"{m}_sum"] / sums_new.loc[level, "n"]
+                rows.append(["group mean", m, f"{factor}={level}", ref, new, abs(new - ref) <= atol])
+    for m in METRICS:
+        F_ref = anova_from_aggregates(agg_ref, m)["F"].drop("Residual")
+        F_new = anova_from_aggregates(agg_new, m)["F"].drop("Residual")
+        for source in F_ref.index:
+            ok = abs(F_new[source] - F_ref[source]) <= rtol * abs(F_ref[source])
+            rows.append(["F value", m, source, F_ref[source], F_new[source], ok])
+    report = pd.DataFrame(rows, columns=["Quantity", "Metric", "Term", "Reference", "Compact", "ok"])
+    report["Abs_diff"] = (report["Compact"] - report["Reference"]).abs()
+    report["Rel_diff"] = report["Abs_diff"] / report["Reference"].abs()
+    failed = report[~report["ok"]]
+    assert failed.empty, f"precision check failed:\n{failed}"
+    return report
+
+
+def create_table_detailed(df, backend="aggregate", verbose=True):
+    """
+    Produce a Table 1-like summary following Dong (2020):
+    - Reports ANOVA results (without residuals)
+    - Reports group mean differences from the overall mean for Performance & Risk
+
+    backend="aggregate" works from per-cell sufficient statistics, so memory and
+    runtime do not grow with the number of rows; backend="statsmodels" fits the
+    full OLS model as before. df may also be the output of cell_aggregates().
+    verbose=False builds the same tables without printing them.
+    """
+    if backend not in ("aggregate", "statsmodels"):
+        raise ValueError(f"Unknown backend: {backend}")
+    is_agg = "n" in df.columns and "Performance_sum" in df.columns
+    if is_agg and backend == "statsmodels":
+        raise ValueError("the statsmodels backend needs per-firm rows, not cell aggregates")
+    # --- ANOVA ---
+    with phase("anova"):
+        agg = df if is_agg else cell_aggregates(df)
+        if backend == "aggregate":
+            anova_perf = anova_from_aggregates(agg, "Performance")
+            anova_risk = anova_from_aggregates(agg, "Risk")
+        else:
+            anova_perf = anova_statsmodels(df, "Performance")
+            anova_risk = anova_statsmodels(df, "Risk")
+    anova_perf["Metric"] = "Performance"
     anova_risk["Metric"] = "Risk"
 
     combined = (
@@ -54,41 +195,50 @@ def create_table_detailed(df):
     combined["p-value"] = combined["p-value"].apply(lambda x: f"{x:.3g}")
     combined = combined[["Metric", "Source", "Sum Sq", "df", "F value", "p-value"]]
 
-    print("\n📄 Table 1-style ANOVA (no Residuals):")
-    print(combined)
+    if verbose:
+        print("\n📄 Table 1-style ANOVA (no Residuals):")
+        print(combined)
 
     # --- Compute overall means for center-difference calculation ---
-    overall_perf_mean = df["Performance"].mean()
-    overall_risk_mean = df["Risk"].mean()
+    n_total = agg["n"].sum()
+    overall_perf_mean = agg["Performance_sum"].sum() / n_total
+    overall_risk_mean = agg["Risk_sum"].sum() / n_total
 
-    print("\n📊 Group mean differences from overall mean:")
+    if verbose:
+        print("\n📊 Group mean differences from overall mean:")
 
     # helper to compute group mean diff
+    def group_means(factor):
+        sums = agg.groupby(factor, observed=True)[["n", "Performance_sum", "Risk_sum"]].sum()
+        return pd.DataFrame({
+            "Performance": sums["Performance_sum"] / sums["n"],
+            "Risk": sums["Risk_sum"] / sums["n"],
+        })
     def summarize_diff(factor):
         summary = (
-            df.groupby(factor)[["Performance", "Risk"]]
-            .mean()
+            group_means(factor)
             .reset_index()
             .rename(columns={factor: "Level"})
         )
         summary["Perf_diff"] = summary["Performance"] - overall_perf_mean
         summary["Risk_diff"] = summary["Risk"] - overall_risk_mean
         summary = summary.round(3)
-        print(f"\n→ {factor}")
-        print(summary[["Level", "Perf_diff", "Risk_diff"]])
+        if verbose:
+            print(f"\n→ {factor}")
+            print(summary[["Level", "Perf_diff", "Risk_diff"]])
         return summary
     def summarize_diff_asp(factor):
         summary = (
-            df.groupby(factor)[["Performance", "Risk"]]
-            .mean()
+            group_means(factor)
             .reset_index()
             .rename(columns={factor: "Aspiration"})
         )
         summary["Perf_diff"] = summary["Performance"] - overall_perf_mean
         summary["Risk_diff"] = summary["Risk"] - overall_risk_mean
         summary = summary.round(3)
-        print(f"\n→ {factor}")
-        print(summary[["Aspiration", "Perf_diff", "Risk_diff"]])
+        if verbose:
+            print(f"\n→ {factor}")
+            print(summary[["Aspiration", "Perf_diff", "Risk_diff"]])
         return summary
 
     asp_summary = summarize_diff_asp("Aspiration")
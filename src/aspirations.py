@@ -34,3 +34,38 @@ class SwitchingAspiration:
     def update(self,self_performance,ref_performance):#dynamically switching based on either its reference group P or historical performance
         performance = ref_performance if self_performance < ref_performance else self_performance
         self.value = GAMMA * self.value + (1 - GAMMA) * (1 + MU) * performance
+
+
+### vectorized aspirations: all firms of one simulation held in a single array ###
+class AspirationVector:
+    """Aspiration levels of all firms, updated with one array operation per period.
+
+    Applies the same rules as the per-firm classes above, element-wise.
+    Values keep the given dtype (float64 by default, or float32) across updates.
+    gamma, mu and w default to the values in src.config.
+    """
+    TYPES = ("historical", "social", "mixed", "switching")
+
+    def __init__(self, aspiration_type, init_vals, dtype=float, gamma=GAMMA, mu=MU, w=W):
+        if aspiration_type not in self.TYPES:
+            raise ValueError("Unknown aspiration type")
+        self.aspiration_type = aspiration_type
+        self.values = np.array(init_vals, dtype=dtype)
+        self.gamma, self.mu, self.w = gamma, mu, w
+
+    @property
+    def uses_peers(self):
+        """Whether the rule needs the reference group performance."""
+        return self.aspiration_type != "historical"
+
+    def update(self, performance, ref_performance=None):
+        if self.aspiration_type == "historical":
+            target = performance
+        elif self.aspiration_type == "social":
+            target = ref_performance
+        elif self.aspiration_type == "mixed":
+            target = self.w * performance + (1 - self.w) * ref_performance
+        else:  # switching: the higher of own and reference performance
+            target = np.where(performance < ref_performance, ref_performance, performance)
+        new_values = self.gamma * self.values + (1 - self.gamma) * (1 + self.mu) * target
+        self.values = new_values.astype(self.values.dtype, copy=False)
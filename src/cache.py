@@ -0,0 +1,61 @@
+# src/cache.py
+
+### content-addressed on-disk store of simulation results ###
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import numpy as np
+
+# Default cache directory
+cache_dir = Path(__file__).resolve().parents[1] / "cache"
+
+# bump when a change to the simulation kernel invalidates stored results
+CACHE_VERSION = 1
+
+class ResultCache:
+    """Store arrays under a hash of the full parameter set that produced them.
+
+    Every entry is one compressed .npz file named by the SHA-256 of the
+    canonical JSON of its parameters, sharded by the first two hex digits.
+    Files are written to a temporary name and renamed, so an interrupted run
+    never leaves a partial entry behind.
+    """
+    def __init__(self, root=None):
+        self.root = Path(root) if root is not None else cache_dir
+
+    @staticmethod
+    def key(params):
+        payload = json.dumps({"version": CACHE_VERSION, **params},
+                             sort_keys=True, default=_to_json)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def path(self, params):
+        key = self.key(params)
+        return self.root / key[:2] / f"{key}.npz"
+
+    def get(self, params):
+        """Return the stored arrays as a dict, or None if the entry is missing."""
+        path = self.path(params)
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    def put(self, params, **arrays):
+        path = self.path(params)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez_compressed(tmp, **arrays)
+        os.replace(tmp, path)
+
+    def __contains__(self, params):
+        return self.path(params).exists()
+
+def _to_json(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Cannot hash parameter of type {type(obj).__name__}")
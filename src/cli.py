@@ -0,0 +1,288 @@
+# src/cli.py
+
+### headless command-line interface ###
+
+"""
+Usage (from the project root):
+
+    python -m src.cli simulate --firms 200 --periods 1000 --runs 1000 --workers 8 -o outputs/results.pkl
+    python -m src.cli analyze outputs/results.pkl --bootstrap 2000 --tables-dir outputs/tables
+    python -m src.cli plot outputs/results.pkl --workers 4
+    python -m src.cli bench --groups simulation --repeat 5
+
+Every subcommand imports what it needs when it runs: simulate loads only
+NumPy, pandas and the simulator (Numba only with --backend numba, SciPy only
+for --adaptive-tol or --strategy network), analyze adds SciPy (statsmodels
+only with --anova-backend statsmodels), and plot is the only subcommand that
+loads matplotlib / seaborn, on the non-interactive Agg backend. Cluster jobs
+that only simulate therefore start without touching any display backend.
+Result tables are written as pickle (keeps categories and attrs), csv, parquet or json;
+parquet needs pyarrow or fastparquet, which is checked before anything runs.
+"""
+
+import argparse
+import importlib.util
+import sys
+from pathlib import Path
+
+from src.config import NUM_ORG, NUM_PERIOD, NUM_REPEAT, SEED, PRECISIONS
+
+FORMATS = {".pkl": "pickle", ".pickle": "pickle", ".csv": "csv", ".parquet": "parquet", ".json": "json"}
+EXTENSIONS = {"pickle": ".pkl", "csv": ".csv", "parquet": ".parquet", "json": ".json"}
+STRATEGIES = ["stepwise", "ambitious", "conservative", "network"]
+NETWORKS = ["random", "small-world", "clusters"]
+PARQUET_ENGINES = ("pyarrow", "fastparquet")
+
+
+# ---------- Table I/O ----------
+def table_format(path, fmt=None):
+    """Explicit fmt, else the format implied by the file suffix (pickle if unknown)."""
+    return fmt or FORMATS.get(Path(path).suffix, "pickle")
+
+
+def write_table(df, path, fmt=None):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fmt = table_format(path, fmt)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "json":
+        df.to_json(path, orient="records", indent=2)
+    else:
+        df.to_pickle(path)
+    print(f"📁 Saved {path}")
+
+
+def table_formats(args):
+    """Every table format the parsed command will read or write."""
+    formats = set()
+    if args.command == "simulate":
+        formats.add(table_format(args.output, args.format))
+    elif args.command in ("analyze", "plot"):
+        formats.add(table_format(args.results, args.format))
+    if getattr(args, "tables_dir", None) is not None:
+        formats.add(args.tables_format)
+    return formats
+
+
+def read_table(path, fmt=None):
+    import pandas as pd
+    fmt = table_format(path, fmt)
+    if fmt == "csv":
+        df = pd.read_csv(path)
+    elif fmt == "parquet":
+        df = pd.read_parquet(path)
+    elif fmt == "json":
+        df = pd.read_json(path, orient="records")
+    else:
+        return pd.read_pickle(path)
+    # text formats lose the categorical factors
+    for factor in ["Aspiration", "Tech_Uncert_Level", "Market_Uncert_Level", "Strategy"]:
+        if factor in df.columns:
+            df[factor] = df[factor].astype("category")
+    return df
+
+
+# ---------- Subcommands ----------
+def accepts_cache(args):
+    """Whether the simulate flags allow a --cache-dir (see run_experiment)."""
+    return not (args.batched or args.chunk_size is not None or args.crn or args.trajectory_dir is not None
+                or args.strategy == "network")
+
+
+def build_network(args):
+    """PeerNetwork of --strategy network from the --network flags."""
+    from src import networks
+    if args.network == "random":
+        adjacency = networks.random_graph(args.firms, args.degree, seed=args.network_seed,
+                                          weighted=args.weighted)
+    elif args.network == "small-world":
+        adjacency = networks.small_world(args.firms, max(1, args.degree // 2), args.rewire_p,
+                                         seed=args.network_seed, weighted=args.weighted)
+    else:
+        adjacency, _ = networks.industry_clusters(args.firms, args.clusters, args.degree, p_out=args.rewire_p,
+                                                  seed=args.network_seed, weighted=args.weighted)
+    return networks.PeerNetwork(adjacency, rewire_every=args.rewire_every, rewire_prob=args.rewire_prob)
+
+
+def simulate(args):
+    from src.simulation import run_experiment
+    from src.instrumentation import print_progress
+
+    options = dict(batched=args.batched, chunk_size=args.chunk_size, burn_in=args.burn_in,
+                   workers=args.workers, seed=args.seed, cache_dir=args.cache_dir, backend=args.backend,
+                   progress=print_progress if args.progress else None, crn=args.crn,
+                   trajectory_dir=args.trajectory_dir, trajectory_every=args.trajectory_every,
+                   trajectory_dtype=args.trajectory_dtype, precision=args.precision)
+    if args.strategy == "network":
+        options["network"] = build_network(args)
+    if args.adaptive_tol is not None:
+        options.update(adaptive_tol=args.adaptive_tol, batch_runs=args.batch_runs,
+                       criterion=args.criterion, scope=args.scope)
+
+    df = run_experiment(args.firms, args.periods, args.strategy, args.runs, **options)
+    write_table(df, args.output, args.format)
+    if args.analyze:
+        analyze_frame(df, args)
+    return 0
+
+
+def analyze_frame(df, args):
+    """Table 1 (plus the bootstrap tables with --bootstrap N) of a result table; optionally written out."""
+    from src.analysis import create_table_detailed
+    anova_df, asp_summary, tech_summary, market_summary = create_table_detailed(df, backend=args.anova_backend)
+    tables = {"anova": anova_df, "asp_summary": asp_summary, "tech_summary": tech_summary,
+              "market_summary": market_summary}
+    if args.bootstrap:
+        from src.inference import bootstrap_tables
+        asp_ci, tech_ci, market_ci, contrasts = bootstrap_tables(
+            df, n_boot=args.bootstrap, confidence=args.confidence, seed=args.seed,
+            workers=args.workers or 1, paired=args.paired)
+        tables.update(asp_ci=asp_ci, tech_ci=tech_ci, market_ci=market_ci, contrasts=contrasts)
+    if args.tables_dir is not None:
+        fmt = args.tables_format
+        for name, table in tables.items():
+            write_table(table, Path(args.tables_dir) / f"{name}{EXTENSIONS[fmt]}", fmt)
+    return tables
+
+
+def analyze(args):
+    analyze_frame(read_table(args.results, args.format), args)
+    return 0
+
+
+def plot(args):
+    import matplotlib
+    matplotlib.use("Agg")  # headless: never open a display
+    from src import plotting
+    from src.analysis import create_table_detailed
+
+    df = read_table(args.results, args.format)
+    anova_df, asp_summary, tech_summary, market_summary = create_table_detailed(df)
+    plotting.plot_results(df, anova_df=anova_df, asp_summary=asp_summary, tech_summary=tech_summary,
+                          market_summary=market_summary,
+                          trajectories=args.trajectories or df.attrs.get("trajectory_dir"),
+                          workers=args.workers, force=args.force, directory=args.out_dir)
+    return 0
+
+
+def profiled(command, args):
+    """Run a subcommand; with --profile, report the phases of the whole command and save them."""
+    if not getattr(args, "profile", None):
+        return command(args)
+    from src.instrumentation import profile
+    with profile() as prof:
+        status = command(args)
+    prof.report()
+    if str(args.profile).endswith(".json"):
+        prof.to_json(args.profile)
+    else:
+        prof.dump_stats(args.profile)
+    return status
+
+
+def bench(args):
+    from benchmarks.bench import main as bench_main
+    return bench_main(args.bench_args)
+
+
+# ---------- Parser ----------
+def _add_profile_flag(parser):
+    parser.add_argument("--profile", metavar="PATH",
+                        help="write phase timings of the whole command to PATH (.json, or .prof for pstats/snakeviz)")
+
+
+def _add_analysis_flags(parser):
+    parser.add_argument("--anova-backend", default="aggregate", choices=["aggregate", "statsmodels"])
+    parser.add_argument("--bootstrap", type=int, default=0, metavar="N",
+                        help="run-level bootstrap replicates for CIs and pairwise contrasts (0 = off)")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--paired", action="store_true", help="draw the same runs in every cell (crn results)")
+    parser.add_argument("--tables-dir", type=Path, help="write every table into this directory")
+    parser.add_argument("--tables-format", default="csv", choices=list(EXTENSIONS))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m src.cli",
+                                     description="Dong (2020) replication: simulate, analyze, plot, bench")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sim = commands.add_parser("simulate", help="run the aspiration x uncertainty grid and save the result table")
+    sim.add_argument("--firms", type=int, default=NUM_ORG)
+    sim.add_argument("--periods", type=int, default=NUM_PERIOD)
+    sim.add_argument("--runs", type=int, default=NUM_REPEAT, help="runs per cell (the budget with --adaptive-tol)")
+    sim.add_argument("--strategy", default="stepwise", choices=STRATEGIES)
+    sim.add_argument("--seed", type=int, default=SEED,
+                     help="seeds every (cell, run) stream (batched runs: every chunk), in every mode")
+    sim.add_argument("--burn-in", type=int, default=0)
+    sim.add_argument("--workers", type=int, help="processes; omit to run in-process (same results for any count)")
+    sim.add_argument("--batched", action="store_true", help="advance all runs of a cell together")
+    sim.add_argument("--chunk-size", type=int)
+    sim.add_argument("--backend", default="numpy", choices=["numpy", "numba"])
+    sim.add_argument("--precision", default="float64", choices=list(PRECISIONS))
+    sim.add_argument("--cache-dir", type=Path)
+    sim.add_argument("--crn", action="store_true", help="common random numbers across aspiration types")
+    sim.add_argument("--trajectory-dir", type=Path)
+    sim.add_argument("--trajectory-every", type=int, default=1)
+    sim.add_argument("--trajectory-dtype", default="float32", choices=list(PRECISIONS))
+    sim.add_argument("--adaptive-tol", type=float)
+    sim.add_argument("--batch-runs", type=int, default=50)
+    sim.add_argument("--criterion", default="diff", choices=["diff", "f"])
+    sim.add_argument("--scope", default="cell", choices=["cell", "grid"])
+    sim.add_argument("--network", default="small-world", choices=NETWORKS, help="peer graph of --strategy network")
+    sim.add_argument("--degree", type=int, default=10, help="peers per firm")
+    sim.add_argument("--clusters", type=int, default=10, help="industries of --network clusters")
+    sim.add_argument("--rewire-p", type=float, default=0.1,
+                     help="small-world shortcut / cross-industry edge probability")
+    sim.add_argument("--weighted", action="store_true", help="exponential edge weights")
+    sim.add_argument("--network-seed", type=int, default=SEED)
+    sim.add_argument("--rewire-every", type=int, default=0, help="rewire the graph every N periods (0 = never)")
+    sim.add_argument("--rewire-prob", type=float, default=0.0)
+    sim.add_argument("--progress", action="store_true", help="print completed runs and ETA per cell")
+    sim.add_argument("-o", "--output", type=Path, default=Path("outputs/results.pkl"))
+    sim.add_argument("--format", choices=list(EXTENSIONS), help="default: from the --output suffix")
+    sim.add_argument("--analyze", action="store_true", help="also print Table 1 after simulating")
+    _add_analysis_flags(sim)
+    _add_profile_flag(sim)
+
+    ana = commands.add_parser("analyze", help="Table 1 ANOVA, group differences and bootstrap tables")
+    ana.add_argument("results", type=Path)
+    ana.add_argument("--format", choices=list(EXTENSIONS), help="default: from the file suffix")
+    ana.add_argument("--workers", type=int, default=1)
+    ana.add_argument("--seed", type=int, default=SEED)
+    _add_analysis_flags(ana)
+    _add_profile_flag(ana)
+
+    fig = commands.add_parser("plot", help="render the figures of a result table (headless)")
+    fig.add_argument("results", type=Path)
+    fig.add_argument("--format", choices=list(EXTENSIONS), help="default: from the file suffix")
+    fig.add_argument("--out-dir", type=Path, help="default: outputs/")
+    fig.add_argument("--trajectories", type=Path, help="TrajectoryStore for the period dynamics plot")
+    fig.add_argument("--workers", type=int, default=1)
+    fig.add_argument("--force", action="store_true", help="redraw figures whose inputs are unchanged")
+    _add_profile_flag(fig)
+
+    commands.add_parser("bench", help="benchmarks (further arguments are passed to benchmarks.bench)",
+                        add_help=False)
+    return parser
+
+
+COMMANDS = {"simulate": simulate, "analyze": analyze, "plot": plot, "bench": bench}
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        args.bench_args = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    if "parquet" in table_formats(args) and not any(map(importlib.util.find_spec, PARQUET_ENGINES)):
+        parser.error("parquet tables need pyarrow or fastparquet (pip install pyarrow)")
+    return profiled(COMMANDS[args.command], args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -43,5 +43,26 @@ UNCERTAINTY_LEVELS = [
     ("high_tech_high_market",TECH_UNCERT_HIGH,MARKET_UNCERT_HIGH)
 ]
 
+### Batched simulation ###
+BATCH_MAX_ELEMENTS = 2_000_000  # cap on firm states (runs x firms) advanced per chunk of runs
+
+### Common random numbers ###
+CRN_BLOCK_PERIODS = 64  # periods of market innovations / candidate S_it drawn per bulk call
+CRN_STREAM_KEY = 1      # leading SeedSequence spawn key that separates CRN streams from per-unit streams
+
+### Seeded batches ###
+BATCH_STREAM_KEY = 2    # leading spawn key of the per-chunk streams of batched runs
+
+### Numeric precision ###
+PRECISIONS = ("float64", "float32")  # float32 halves simulator state, result columns and cached files
+
+### Trajectory store ###
+TRAJECTORY_BLOCK_PERIODS = 64  # stored periods buffered in memory before one write to the memmap
+
+### Bootstrap inference ###
+BOOTSTRAP_REPLICATES = 2000  # run-level bootstrap replicates for CIs and pairwise contrasts
+BOOTSTRAP_CHUNK = 250        # replicates per seeded chunk (the unit of work spread over processes)
+
+
 #random seed
 SEED = 7
\ No newline at end of file
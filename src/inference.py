@@ -0,0 +1,157 @@
+# src/inference.py
+
+### run-level bootstrap confidence intervals and pairwise contrasts ###
+
+"""
+Usage:
+
+    anova_df, asp_summary, tech_summary, market_summary = create_table_detailed(df)
+    asp_ci, tech_ci, market_ci, contrasts = bootstrap_tables(df, n_boot=2000, workers=4)
+
+Firms of one run share their shocks, so the run is the independent unit: the
+bootstrap resamples whole runs (clusters) within every cell instead of firm
+rows. Each run is first reduced to its firm count and metric sums, and a
+replicate is a matrix of run indices per cell, so B replicates of a cell cost
+one fancy-indexing sum over a (B, runs) index matrix and no model is refitted.
+Replicates are drawn in chunks of BOOTSTRAP_CHUNK with their own seeds, so the
+tables do not depend on the worker count.
+
+- asp_ci / tech_ci / market_ci: the Perf_diff / Risk_diff of asp_summary /
+  tech_summary / market_summary with percentile intervals (*_lo, *_hi).
+- contrasts: every pairwise difference of level means within a factor, with
+  Tukey-style simultaneous intervals and adjusted p-values from the bootstrap
+  distribution of the largest studentized difference in the factor.
+With paired=True (e.g. for crn experiments, whose runs are shared across
+aspiration types) the same runs are drawn in every cell.
+"""
+
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from src.config import SEED, BOOTSTRAP_REPLICATES, BOOTSTRAP_CHUNK
+from src.analysis import FACTORS, METRICS, _clean
+
+
+def run_summaries(df):
+    """Firm count "n" and "<metric>_sum" of every (cell, Run_ID) cluster."""
+    df = _clean(df)
+    grouped = df.groupby(FACTORS + ["Run_ID"], observed=True)
+    runs = pd.DataFrame({"n": grouped.size()})
+    for m in METRICS:
+        if df[m].dtype == np.float64:
+            values = grouped[m]
+        else:
+            values = df[m].astype(np.float64).groupby([df[c] for c in FACTORS + ["Run_ID"]], observed=True)
+        runs[f"{m}_sum"] = values.sum()
+    return runs.reset_index()
+
+
+def _cell_arrays(runs):
+    """Cells of runs (a run_summaries table) and each cell's (runs, 1 + metrics) sums."""
+    cells, arrays = [], []
+    for key, block in runs.groupby(FACTORS, observed=True, sort=True):
+        cells.append(key)
+        arrays.append(block[["n"] + [f"{m}_sum" for m in METRICS]].to_numpy(np.float64))
+    return pd.DataFrame(cells, columns=FACTORS), arrays
+
+
+def _bootstrap_chunk(job):
+    """Cell totals (replicates, cells, 1 + metrics) of one chunk of bootstrap replicates."""
+    arrays, seed_seq, size, paired = job
+    rng = np.random.default_rng(seed_seq)
+    out = np.empty((size, len(arrays), arrays[0].shape[1]))
+    idx = rng.integers(len(arrays[0]), size=(size, len(arrays[0]))) if paired else None
+    for c, values in enumerate(arrays):
+        if not paired:
+            idx = rng.integers(len(values), size=(size, len(values)))
+        out[:, c] = values[idx].sum(axis=1)
+    return out
+
+
+def bootstrap_cell_totals(runs, n_boot=BOOTSTRAP_REPLICATES, seed=SEED, workers=1, paired=False):
+    """Cell table and (n_boot, cells, 1 + metrics) resampled cell totals of a run_summaries table."""
+    cells, arrays = _cell_arrays(runs)
+    if paired and len({len(a) for a in arrays}) > 1:
+        raise ValueError("paired resampling needs the same number of runs in every cell")
+    sizes = [min(BOOTSTRAP_CHUNK, n_boot - lo) for lo in range(0, n_boot, BOOTSTRAP_CHUNK)]
+    jobs = [(arrays, seq, size, paired)
+            for seq, size in zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes)]
+    if workers == 1:
+        chunks = list(map(_bootstrap_chunk, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_bootstrap_chunk, jobs))
+    return cells, np.concatenate(chunks), np.stack([a.sum(axis=0) for a in arrays])
+
+
+def _level_means(cells, totals, factor):
+    """Levels of factor and the (..., levels, metrics) means from (..., cells, 1 + metrics) totals."""
+    levels = sorted(cells[factor].unique())
+    member = np.stack([(cells[factor] == level).to_numpy(float) for level in levels], axis=1)
+    sums = np.einsum("...cm,cl->...lm", totals, member)
+    return levels, sums[..., 1:] / sums[..., :1]
+
+
+def _overall_means(totals):
+    sums = totals.sum(axis=-2)
+    return sums[..., 1:] / sums[..., :1]
+
+
+def bootstrap_tables(df, n_boot=BOOTSTRAP_REPLICATES, confidence=0.95, seed=SEED, workers=1,
+                     paired=False):
+    """
+    Run-level (cluster) bootstrap of the Table 1 group mean differences and of
+    all pairwise level contrasts. Returns asp_ci, tech_ci, market_ci and
+    contrasts (see module docstring); workers > 1 spreads the replicates over
+    that many processes.
+    """
+    alpha = 1 - confidence
+    cells, boot, observed = bootstrap_cell_totals(run_summaries(df), n_boot=n_boot, seed=seed,
+                                                  workers=workers, paired=paired)
+    overall, overall_boot = _overall_means(observed), _overall_means(boot)
+    short = {"Performance": "Perf", "Risk": "Risk"}
+
+    tables, contrasts = [], []
+    for factor in FACTORS:
+        levels, means = _level_means(cells, observed, factor)
+        _, means_boot = _level_means(cells, boot, factor)
+        diff = means - overall
+        diff_boot = means_boot - overall_boot[:, None, :]
+        lo, hi = np.quantile(diff_boot, [alpha / 2, 1 - alpha / 2], axis=0)
+        table = pd.DataFrame({"Aspiration" if factor == "Aspiration" else "Level": levels})
+        for k, m in enumerate(METRICS):
+            table[f"{short[m]}_diff"] = diff[:, k]
+            table[f"{short[m]}_lo"] = lo[:, k]
+            table[f"{short[m]}_hi"] = hi[:, k]
+        tables.append(table.round(3))
+
+        pairs = list(itertools.combinations(range(len(levels)), 2))
+        a, b = np.array(pairs).T
+        est = means[a] - means[b]                         # (pairs, metrics)
+        est_boot = means_boot[:, a] - means_boot[:, b]    # (n_boot, pairs, metrics)
+        se = est_boot.std(axis=0, ddof=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            max_t = np.max(np.abs(est_boot - est) / se, axis=1)   # (n_boot, metrics)
+            crit = np.quantile(max_t, confidence, axis=0)
+            p_adj = (max_t[:, None, :] >= np.abs(est / se)).mean(axis=0)
+        for k, m in enumerate(METRICS):
+            contrasts.append(pd.DataFrame({
+                "Factor": factor, "Metric": m,
+                "Level_A": [levels[i] for i in a], "Level_B": [levels[j] for j in b],
+                "Diff": est[:, k], "SE": se[:, k],
+                "Lo": est[:, k] - crit[k] * se[:, k], "Hi": est[:, k] + crit[k] * se[:, k],
+                "p_adj": p_adj[:, k],
+            }))
+    contrasts = pd.concat(contrasts, ignore_index=True).round({"Diff": 3, "SE": 4, "Lo": 3, "Hi": 3})
+
+    level = f"{confidence:.0%}"
+    print(f"\n📏 Run-level bootstrap {level} intervals ({n_boot} replicates):")
+    for factor, table in zip(FACTORS, tables):
+        print(f"\n→ {factor}")
+        print(table)
+    print(f"\n🔀 Pairwise contrasts ({level} simultaneous, Tukey-style):")
+    print(contrasts)
+    asp_ci, tech_ci, market_ci = tables
+    return asp_ci, tech_ci, market_ci, contrasts
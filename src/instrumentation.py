@@ -0,0 +1,174 @@
+# src/instrumentation.py
+
+### phase timers, counters and progress reporting ###
+
+"""
+Usage:
+
+    from src.instrumentation import profile
+    with profile() as prof:
+        df = run_experiment(...)
+    prof.to_json("timings.json")       # or prof.dump_stats("timings.prof") for pstats/snakeviz
+
+Hot paths call phase(name) and count(name, n). While no profile() block is
+active these return a shared no-op context / return immediately, so the
+disabled cost is one global lookup per call. Timings are collected in the
+calling process only; with workers > 1 the simulation phases run in the
+worker processes and are not recorded, but progress still is.
+"""
+
+import contextlib
+import json
+import marshal
+import time
+from collections import defaultdict
+
+_active = None
+_NULL = contextlib.nullcontext()
+
+
+class Profiler:
+    """Accumulated wall time and call count per phase, plus named counters."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.started = time.perf_counter()
+        self.stopped = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+            self.calls[name] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] += int(n)
+
+    @property
+    def wall_seconds(self):
+        return (self.stopped or time.perf_counter()) - self.started
+
+    def summary(self):
+        """Phase timings, counters and derived rates as a plain dict."""
+        simulate = sum(self.seconds[p] for p in SIMULATION_PHASES if p in self.seconds)
+        rates = {}
+        if simulate > 0 and self.counters.get("firm_periods"):
+            rates["firm_periods_per_sec"] = self.counters["firm_periods"] / simulate
+        if self.counters.get("firm_periods"):
+            rates["search_rate"] = self.counters.get("searches", 0) / self.counters["firm_periods"]
+        return {
+            "wall_seconds": self.wall_seconds,
+            "phases": {name: {"seconds": self.seconds[name], "calls": self.calls[name]}
+                       for name in sorted(self.seconds, key=self.seconds.get, reverse=True)},
+            "counters": dict(self.counters),
+            "rates": rates,
+        }
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def dump_stats(self, path):
+        """Write the phases in cProfile's marshal format, readable by pstats.Stats(path)."""
+        stats = {}
+        for name, seconds in self.seconds.items():
+            calls = self.calls[name]
+            stats[("src/instrumentation.py", 0, name)] = (calls, calls, seconds, seconds, {})
+        with open(path, "wb") as f:
+            marshal.dump(stats, f)
+
+    def report(self):
+        summary = self.summary()
+        print(f"\n⏱️ Timings ({summary['wall_seconds']:.2f}s wall):")
+        for name, row in summary["phases"].items():
+            print(f"  {name:<20} {row['seconds']:10.3f}s  {row['calls']:>10} calls")
+        for name, value in summary["rates"].items():
+            print(f"  {name:<20} {value:,.4g}")
+
+
+# phases that make up the simulation kernel, used for the firm-periods/sec rate
+SIMULATION_PHASES = ("market_update", "search_decision", "peer_computation",
+                     "aspiration_update", "compiled_kernel")
+
+
+def active():
+    """The Profiler of the enclosing profile() block, or None."""
+    return _active
+
+
+def phase(name):
+    if _active is None:
+        return _NULL
+    return _active.phase(name)
+
+
+def count(name, n=1):
+    if _active is not None:
+        _active.count(name, n)
+
+
+@contextlib.contextmanager
+def profile(profiler=None):
+    """Enable instrumentation inside the block; yields the Profiler."""
+    global _active
+    previous = _active
+    _active = profiler if profiler is not None else Profiler()
+    try:
+        yield _active
+    finally:
+        _active.stopped = time.perf_counter()
+        _active = previous
+
+
+class ProgressTracker:
+    """Turns completed runs into progress events with a per-cell and overall ETA.
+
+    callback receives a dict with cell_idx, cell, runs_done, n_runs, cells_done,
+    n_cells, fraction (of all runs), elapsed, cell_eta and eta (seconds).
+    """
+
+    def __init__(self, callback, cells, n_runs):
+        self.callback = callback
+        self.cells = cells
+        self.n_runs = n_runs
+        self.done = [0] * len(cells)
+        self.cell_started = {}
+        self.started = time.perf_counter()
+
+    def start_cell(self, cell_idx):
+        self.cell_started.setdefault(cell_idx, time.perf_counter())
+
+    def runs_done(self, cell_idx, n=1):
+        now = time.perf_counter()
+        self.start_cell(cell_idx)
+        self.done[cell_idx] += n
+        runs_done = self.done[cell_idx]
+        total_done = sum(self.done)
+        total = self.n_runs * len(self.cells)
+        cell_rate = runs_done / max(now - self.cell_started[cell_idx], 1e-12)
+        rate = total_done / max(now - self.started, 1e-12)
+        self.callback({
+            "cell_idx": cell_idx,
+            "cell": self.cells[cell_idx],
+            "runs_done": runs_done,
+            "n_runs": self.n_runs,
+            "cells_done": sum(d >= self.n_runs for d in self.done),
+            "n_cells": len(self.cells),
+            "fraction": total_done / total,
+            "elapsed": now - self.started,
+            "cell_eta": (self.n_runs - runs_done) / cell_rate,
+            "eta": (total - total_done) / rate,
+        })
+
+
+def print_progress(event):
+    """Simple console progress callback."""
+    tech, market, d, v, asp = event["cell"]
+    print(f"  [{event['cells_done']}/{event['n_cells']} cells] {asp:<10} tech={tech:<4} market={market:<4} "
+          f"run {event['runs_done']}/{event['n_runs']}  cell ETA {event['cell_eta']:.0f}s  "
+          f"total ETA {event['eta']:.0f}s", flush=True)
@@ -0,0 +1,210 @@
+# src/kernels.py
+
+### compiled simulation kernel (optional Numba backend) ###
+
+"""
+The whole period loop of _simulate_runs compiled with Numba: market update,
+search decision, aspiration update, reference group performance and the
+running moments. Given the same np.random.Generator it consumes the stream in
+the same order as the NumPy engine and reproduces its output bit for bit
+(sums follow NumPy's pairwise summation). Without Numba installed the
+"numba" backend falls back to the NumPy engine.
+"""
+
+import warnings
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # optional dependency
+    numba = None
+
+BACKENDS = ("numpy", "numba")
+
+ASPIRATION_CODES = {"historical": 0, "social": 1, "mixed": 2, "switching": 3}
+STRATEGY_CODES = {"conservative": 0, "stepwise": 1, "ambitious": 2}
+
+
+def resolve_backend(backend):
+    """Validate a backend name; "numba" degrades to "numpy" when Numba is missing."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    if backend == "numba" and numba is None:
+        warnings.warn("numba is not installed; falling back to the numpy backend")
+        return "numpy"
+    return backend
+
+
+def _jit(func):
+    return numba.njit(func) if numba is not None else func
+
+
+@_jit
+def _pairwise_sum(a, lo, n):
+    # same association order as NumPy's pairwise summation of a float64 row
+    if n < 8:
+        res = 0.0
+        for i in range(lo, lo + n):
+            res += a[i]
+        return res
+    elif n <= 128:
+        r = np.empty(8)
+        for j in range(8):
+            r[j] = a[lo + j]
+        i = 8
+        while i < n - (n % 8):
+            for j in range(8):
+                r[j] += a[lo + i + j]
+            i += 8
+        res = ((r[0] + r[1]) + (r[2] + r[3])) + ((r[4] + r[5]) + (r[6] + r[7]))
+        while i < n:
+            res += a[lo + i]
+            i += 1
+        return res
+    else:
+        n2 = n // 2
+        n2 -= n2 % 8
+        return _pairwise_sum(a, lo, n2) + _pairwise_sum(a, lo + n2, n - n2)
+
+
+@_jit
+def _row_peer_perfs(P, strat_code, percentile, out):
+    """Reference group performance of every firm in one population (one row)."""
+    n = P.shape[0]
+    if strat_code == 0:
+        out[:] = (0.0 + _pairwise_sum(P, 0, n)) / n
+        return
+
+    num_ref = max(1, int(percentile * n))
+    order = np.argsort(P, kind="mergesort")
+    s = P[order]
+    if strat_code == 2:
+        m = min(num_ref, n)
+        out[:] = (0.0 + _pairwise_sum(s, n - m, m)) / m
+        return
+
+    k = min(num_ref, n - 1)
+    if k < 1:
+        out[:] = np.nan
+        return
+
+    # equal values below a firm are taken lowest index first: reversed index within the group
+    group_lo = np.empty(n, dtype=np.int64)
+    group_hi = np.empty(n, dtype=np.int64)
+    for j in range(n):
+        group_lo[j] = j if j == 0 or s[j] != s[j - 1] else group_lo[j - 1]
+    for j in range(n - 1, -1, -1):
+        group_hi[j] = j if j == n - 1 or s[j] != s[j + 1] else group_hi[j + 1]
+
+    csum = np.empty(n + 1)
+    csum[0] = 0.0
+    for j in range(n):
+        csum[j + 1] = csum[j] + s[j]
+
+    for p in range(n):
+        x = s[p]
+        lo = max(p - k, 0)
+        hi = min(p, n - k - 1)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            left_gap = x - s[mid]
+            right_gap = s[mid + k + 1] - x
+            left_rank = order[group_lo[mid] + group_hi[mid] - mid]
+            if left_gap > right_gap or (left_gap == right_gap and left_rank > order[mid + k + 1]):
+                lo = mid + 1
+            else:
+                hi = mid
+        out[order[p]] = ((csum[lo + k + 1] - csum[lo]) - x) / k
+
+
+@_jit
+def _period_loop(T, M, P, A, d, v, asp_code, strat_code, gamma, mu, w, percentile,
+                 burn_in, n_periods, rng, mean, m2, records, record):
+    n_runs, n_firms = T.shape
+    rate = (1 - gamma) * (1 + mu)
+    peer = np.empty(n_firms)
+    search = np.empty((n_runs, n_firms), dtype=np.bool_)
+    count = 0
+    for t in range(n_periods):
+        # Market update (independent of decision)
+        z = rng.standard_normal((n_runs, n_firms))
+        for r in range(n_runs):
+            for i in range(n_firms):
+                M[r, i] = v * M[r, i] + (1 - v) * z[r, i]
+
+        # Technological choice decision (using P_{t-1} vs A_{t-1})
+        n_search = 0
+        for r in range(n_runs):
+            for i in range(n_firms):
+                search[r, i] = P[r, i] < A[r, i]
+                if search[r, i]:
+                    n_search += 1
+        S_it = rng.standard_normal(n_search)
+        j = 0
+        for r in range(n_runs):
+            for i in range(n_firms):
+                T[r, i] = d * T[r, i]
+                if search[r, i]:
+                    T[r, i] = max(T[r, i], S_it[j])
+                    j += 1
+                P[r, i] = T[r, i] + M[r, i]
+
+        # Aspiration update with P_t
+        for r in range(n_runs):
+            if asp_code != 0:
+                _row_peer_perfs(P[r], strat_code, percentile, peer)
+            for i in range(n_firms):
+                if asp_code == 0:
+                    target = P[r, i]
+                elif asp_code == 1:
+                    target = peer[i]
+                elif asp_code == 2:
+                    target = w * P[r, i] + (1 - w) * peer[i]
+                else:
+                    target = peer[i] if P[r, i] < peer[i] else P[r, i]
+                A[r, i] = gamma * A[r, i] + rate * target
+
+        # Running moments (Welford) after burn-in
+        if t >= burn_in:
+            count += 1
+            for r in range(n_runs):
+                for i in range(n_firms):
+                    delta = P[r, i] - mean[r, i]
+                    mean[r, i] += delta / count
+                    m2[r, i] += delta * (P[r, i] - mean[r, i])
+        if record:
+            records[t] = P
+
+
+def simulate_runs(T, M, A, aspiration_type, d, v, strategy, n_periods, burn_in,
+                  return_trajectory, rng, gamma, mu, w, percentile):
+    """Run the compiled period loop from initial (runs, firms) states T, M, A.
+
+    Returns the running mean, M2 and, if requested, the performance records.
+    """
+    if aspiration_type not in ASPIRATION_CODES:
+        raise ValueError("Unknown aspiration type")
+    if strategy not in STRATEGY_CODES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    T, M, A = (np.array(x, dtype=float) for x in (T, M, A))
+    P = T + M
+    mean = np.zeros(T.shape)
+    m2 = np.zeros(T.shape)
+    records = np.empty((n_periods,) + T.shape if return_trajectory else (0,) + T.shape)
+    _period_loop(T, M, P, A, float(d), float(v), ASPIRATION_CODES[aspiration_type],
+                 STRATEGY_CODES[strategy], float(gamma), float(mu), float(w), float(percentile),
+                 burn_in, n_periods, rng, mean, m2, records, return_trajectory)
+    return mean, m2, (records if return_trajectory else None)
+
+
+def check_parity(aspiration_type="switching", strategy="stepwise", n_firms=50,
+                 n_periods=50, n_runs=2, seed=0):
+    """Run both backends on the same Generator stream and report whether the outputs are identical."""
+    from src.simulation import _simulate_runs
+    outputs = []
+    for backend in BACKENDS:
+        rng = np.random.default_rng(seed)
+        moments, records = _simulate_runs(aspiration_type, 0.9, 0.5, strategy, n_firms, n_periods,
+                                          n_runs, return_trajectory=True, rng=rng, backend=backend)
+        outputs.append((moments.mean, moments.std(), records))
+    return all(np.array_equal(a, b, equal_nan=True) for a, b in zip(*outputs))
@@ -0,0 +1,134 @@
+# src/live.py
+
+### background execution with progressively updated Table 1 aggregates ###
+
+"""
+Usage:
+
+    experiment = LiveExperiment(200, 1000, "stepwise", 1000).start()
+    while not experiment.done:
+        snap = experiment.snapshot()
+        if snap["aggregates"] is not None:
+            create_table_detailed(snap["aggregates"])   # Table 1 from the runs so far
+        time.sleep(1)
+    df = experiment.result()
+
+The grid is simulated in a background thread, batch_runs replications of
+every cell at a time, so after the first batch every cell has data and the
+ANOVA and group differences can be computed from the running per-cell
+aggregates (analysis.cell_aggregates layout). Units are the seeded (cell, run)
+units of run_experiment(workers=...), so the final table is identical to it.
+"""
+
+import threading
+import time
+import numpy as np
+
+from src.config import SEED
+from src.simulation import experiment_cells, ResultColumns, state_dtype
+from src.parallel import run_cells_parallel
+from src.adaptive import CellStats
+
+
+class LiveExperiment:
+    """The aspiration x uncertainty grid running in a background thread."""
+
+    def __init__(self, n_firms, n_periods, strategy, n_runs, batch_runs=10, workers=1, seed=SEED,
+                 burn_in=0, cache_dir=None, backend="numpy", precision="float64"):
+        self.params = {"n_firms": n_firms, "n_periods": n_periods, "strategy": strategy,
+                       "n_runs": n_runs, "seed": seed, "burn_in": burn_in, "precision": precision}
+        self.batch_runs = batch_runs
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.backend = backend
+        self.cells = experiment_cells()
+        self.runs_done = 0
+        self.error = None
+        self._dtype = state_dtype(precision)
+        self._stats = CellStats(len(self.cells))
+        self._blocks = {c: ([], []) for c in range(len(self.cells))}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    def start(self):
+        """Start the background thread (once); returns self."""
+        if self._thread is None:
+            self._started = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        p = self.params
+        try:
+            cache = None
+            if self.cache_dir is not None:
+                from src.cache import ResultCache
+                cache = ResultCache(self.cache_dir)
+            for lo in range(0, p["n_runs"], self.batch_runs):
+                if self._stop.is_set():
+                    break
+                hi = min(lo + self.batch_runs, p["n_runs"])
+                results = run_cells_parallel(self.cells, n_firms=p["n_firms"], n_periods=p["n_periods"],
+                                             strategy=p["strategy"], n_runs=p["n_runs"], workers=self.workers,
+                                             seed=p["seed"], burn_in=p["burn_in"], cache=cache,
+                                             backend=self.backend, precision=p["precision"],
+                                             run_ranges={c: range(lo, hi) for c in range(len(self.cells))})
+                with self._lock:
+                    for c, (perf, risk) in results.items():
+                        self._blocks[c][0].append(perf)
+                        self._blocks[c][1].append(risk)
+                        self._stats.add(c, "Performance", perf)
+                        self._stats.add(c, "Risk", risk)
+                    self.runs_done = hi
+        except Exception as exc:  # surfaced through snapshot() / result()
+            self.error = exc
+
+    @property
+    def done(self):
+        return self._thread is not None and not self._thread.is_alive()
+
+    @property
+    def complete(self):
+        return self.runs_done == self.params["n_runs"]
+
+    def cancel(self):
+        """Stop after the batch in progress."""
+        self._stop.set()
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.done
+
+    def snapshot(self):
+        """Progress and the current per-cell aggregates (None before the first batch)."""
+        with self._lock:
+            runs_done = self.runs_done
+            aggregates = self._stats.aggregates(self.cells) if runs_done else None
+        n_runs = self.params["n_runs"]
+        elapsed = time.perf_counter() - self._started if self._started is not None else 0.0
+        return {
+            "runs_done": runs_done,
+            "n_runs": n_runs,
+            "fraction": runs_done / n_runs,
+            "elapsed": elapsed,
+            "eta": elapsed * (n_runs - runs_done) / runs_done if runs_done else float("nan"),
+            "done": self.done,
+            "error": self.error,
+            "aggregates": aggregates,
+        }
+
+    def result(self):
+        """The per-firm result table of the finished grid (as run_experiment returns it)."""
+        if self.error is not None:
+            raise self.error
+        if not (self.done and self.complete):
+            raise RuntimeError(f"experiment not finished ({self.runs_done}/{self.params['n_runs']} runs)")
+        columns = ResultColumns(self.cells, self.params["strategy"], self.params["n_runs"],
+                                self.params["n_firms"], dtype=self._dtype)
+        for c, (perf, risk) in self._blocks.items():
+            columns.set_cell(c, np.concatenate(perf), np.concatenate(risk))
+        return columns.to_frame()
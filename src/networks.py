@@ -0,0 +1,129 @@
+# src/networks.py
+
+### network-defined reference groups ###
+
+"""
+Usage:
+
+    net = PeerNetwork(small_world(n_firms, k=5, p=0.1, seed=1), rewire_every=50, rewire_prob=0.05)
+    mean, risk = run_single_simulation("social", 0.9, 0.9, strategy="network", network=net,
+                                       n_firms=n_firms)
+
+Row i of the adjacency lists firm i's peers (entry (i, j) is the weight of
+peer j). Rows are normalised once, so every firm's weighted peer mean for a
+period is one sparse mat-vec, W @ P, or one sparse mat-mat product for a
+(runs, firms) batch. A firm without peers uses its own performance.
+With rewire_every set, every rewire_every periods each edge is redirected to
+a uniformly drawn firm with probability rewire_prob (keeping its weight);
+rewiring draws from the simulation's random stream.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+
+class PeerNetwork:
+    """Row-normalised sparse peer graph (CSR) used as a reference-group strategy."""
+
+    def __init__(self, adjacency, rewire_every=0, rewire_prob=0.0):
+        A = sp.csr_matrix(adjacency, dtype=float)
+        if A.shape[0] != A.shape[1]:
+            raise ValueError("adjacency must be square (firms x firms)")
+        if not 0 <= rewire_prob <= 1:
+            raise ValueError("rewire_prob must be in [0, 1]")
+        if A.nnz and A.data.min() < 0:
+            raise ValueError("edge weights must be non-negative")
+        self.adjacency = A
+        self.rewire_every = rewire_every
+        self.rewire_prob = rewire_prob
+        row_sums = np.asarray(A.sum(axis=1)).ravel()
+        self.isolated = np.flatnonzero(row_sums == 0)
+        scale = np.divide(1.0, row_sums, out=np.zeros_like(row_sums), where=row_sums > 0)
+        self.weights = sp.csr_matrix(sp.diags(scale) @ A)
+
+    @property
+    def n_firms(self):
+        return self.adjacency.shape[0]
+
+    def peer_means(self, P):
+        """Weighted peer mean of every firm; P is (firms,) or (runs, firms)."""
+        P = np.asarray(P)
+        if P.shape[-1] != self.n_firms:
+            raise ValueError(f"network has {self.n_firms} firms, performance has {P.shape[-1]}")
+        out = self.weights @ P if P.ndim == 1 else (self.weights @ P.T).T
+        if self.isolated.size:
+            out[..., self.isolated] = P[..., self.isolated]
+        return out
+
+    def due(self, t):
+        """Whether the graph is rewired before the peer computation of period t."""
+        return self.rewire_every > 0 and t > 0 and t % self.rewire_every == 0
+
+    def rewired(self, rng):
+        """A copy with every edge redirected to a uniform random firm with probability rewire_prob.
+
+        Each edge keeps its row and weight, so the copy's row normalisation
+        (recomputed from its adjacency) has the same row scales; draws that
+        would create a self-loop move to the next firm instead. A single firm
+        has no other firm to link to and is returned unchanged.
+        """
+        if self.n_firms < 2:
+            return self
+        A = self.adjacency.copy()
+        n, nnz = self.n_firms, A.nnz
+        move = np.flatnonzero(rng.random(nnz) < self.rewire_prob)
+        rows = np.repeat(np.arange(n), np.diff(A.indptr))[move]
+        targets = (rng.random(move.size) * n).astype(A.indices.dtype)
+        targets = np.where(targets == rows, (targets + 1) % n, targets)
+        A.indices[move] = targets
+        A.has_sorted_indices = False
+        A.sum_duplicates()
+        return PeerNetwork(A, rewire_every=self.rewire_every, rewire_prob=self.rewire_prob)
+
+
+# ---------- Graph generators (CSR adjacency, no self-loops) ----------
+def _csr(rows, cols, n, weights=None):
+    keep = rows != cols
+    data = np.ones(keep.sum()) if weights is None else np.asarray(weights)[keep]
+    A = sp.csr_matrix((data, (rows[keep], cols[keep])), shape=(n, n))
+    A.sum_duplicates()
+    return A
+
+
+def _weights(rng, size, weighted):
+    return rng.exponential(1.0, size) if weighted else None
+
+
+def random_graph(n_firms, mean_degree, seed=None, weighted=False):
+    """Directed Erdős–Rényi-style graph: n_firms * mean_degree uniformly drawn edges."""
+    rng = np.random.default_rng(seed)
+    m = int(n_firms * mean_degree)
+    rows, cols = rng.integers(n_firms, size=m), rng.integers(n_firms, size=m)
+    return _csr(rows, cols, n_firms, _weights(rng, m, weighted))
+
+
+def small_world(n_firms, k, p, seed=None, weighted=False):
+    """Watts–Strogatz graph: ring lattice with k neighbours on each side, each edge rewired with probability p."""
+    rng = np.random.default_rng(seed)
+    offsets = np.concatenate([np.arange(1, k + 1), -np.arange(1, k + 1)])
+    rows = np.repeat(np.arange(n_firms), offsets.size)
+    cols = (rows + np.tile(offsets, n_firms)) % n_firms
+    move = rng.random(rows.size) < p
+    cols = np.where(move, rng.integers(n_firms, size=rows.size), cols)
+    return _csr(rows, cols, n_firms, _weights(rng, rows.size, weighted))
+
+
+def industry_clusters(n_firms, n_clusters, degree, p_out=0.0, seed=None, weighted=False):
+    """Firms split into n_clusters industries; each firm draws degree peers, from
+    its own industry except with probability p_out. Returns (adjacency, industry labels)."""
+    rng = np.random.default_rng(seed)
+    industry = rng.integers(n_clusters, size=n_firms)
+    order = np.argsort(industry, kind="stable")
+    starts = np.searchsorted(industry[order], np.arange(n_clusters + 1))
+    rows = np.repeat(np.arange(n_firms), degree)
+    own = industry[rows]
+    size = starts[own + 1] - starts[own]
+    cols = order[starts[own] + (rng.random(rows.size) * size).astype(np.int64)]
+    outside = rng.random(rows.size) < p_out
+    cols = np.where(outside, rng.integers(n_firms, size=rows.size), cols)
+    return _csr(rows, cols, n_firms, _weights(rng, rows.size, weighted)), industry
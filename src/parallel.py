@@ -0,0 +1,124 @@
+# src/parallel.py
+
+### deterministic multi-process execution of the experiment grid ###
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import numpy as np
+from src.config import SEED, GAMMA, MU, W, PERCENTILE_STEPWISE
+from src.simulation import run_single_simulation, unit_seed
+
+# behavioural parameters a unit may override, given as (name, value) pairs
+# (keyword names of run_single_simulation)
+BEHAVIOR_DEFAULTS = {"gamma": GAMMA, "mu": MU, "w": W, "percentile": PERCENTILE_STEPWISE}
+
+def _run_unit(unit):
+    """Simulate one (cell, run) unit with its own Generator (executed in a worker)."""
+    (cell_idx, run_id, cell, seed, n_firms, n_periods, strategy, burn_in, precision,
+     backend, trajectory_dir, behavior) = unit
+    _, _, d, v, asp = cell
+    rng = np.random.default_rng(unit_seed(seed, cell_idx, run_id))
+    recorder = None
+    if trajectory_dir is not None:
+        from src.trajectories import TrajectoryStore
+        recorder = TrajectoryStore.open(trajectory_dir, mode="r+").recorder(cell_idx, run_id)
+    return run_single_simulation(asp, d, v, strategy=strategy, n_firms=n_firms,
+                                 n_periods=n_periods, burn_in=burn_in, rng=rng,
+                                 backend=backend, recorder=recorder, precision=precision,
+                                 **dict(behavior or ()))
+
+def unit_params(unit):
+    """Full parameter set of a work unit, used as its result cache key.
+
+    The kernel backend is left out: all backends produce identical results.
+    precision only enters the key when it is not float64, so existing float64
+    entries keep their keys.
+    """
+    cell_idx, run_id, cell, seed, n_firms, n_periods, strategy, burn_in, precision = unit[:9]
+    behavior = dict(BEHAVIOR_DEFAULTS, **dict(unit[11] or ()))
+    _, _, d, v, asp = cell
+    seq = unit_seed(seed, cell_idx, run_id)
+    params = {
+        "aspiration": asp, "d": d, "v": v, "strategy": strategy,
+        "n_firms": n_firms, "n_periods": n_periods, "burn_in": burn_in,
+        "seed": seq.entropy, "spawn_key": list(seq.spawn_key),
+        "GAMMA": behavior["gamma"], "MU": behavior["mu"], "W": behavior["w"],
+        "PERCENTILE_STEPWISE": behavior["percentile"],
+    }
+    if precision != "float64":
+        params["precision"] = precision
+    return params
+
+def run_cells_parallel(cells, n_firms, n_periods, strategy, n_runs, workers=None,
+                       seed=SEED, burn_in=0, cache=None, backend="numpy", on_unit=None,
+                       run_ranges=None, trajectory_dir=None, precision="float64"):
+    """Simulate every (cell, run) unit of the grid on a process pool.
+
+    cells is the list returned by experiment_cells(); workers=None uses all
+    cores and workers=1 runs in-process. With a ResultCache, units already in
+    the cache are loaded instead of simulated and new units are stored as soon
+    as they finish, so an interrupted grid resumes where it stopped.
+    on_unit(cell_idx), if given, is called whenever a unit is available.
+    run_ranges ({cell_idx: range of run ids}) restricts the work to those runs;
+    by default every cell runs range(n_runs).
+    trajectory_dir names an existing TrajectoryStore that every simulated unit
+    records its per-period states into (cached units are not re-recorded).
+    precision="float32" simulates, returns and caches float32 arrays.
+    Returns {cell_idx: (mean_perf, risk)} with (len(runs), n_firms) arrays,
+    identical for any worker count.
+    """
+    if run_ranges is None:
+        run_ranges = {cell_idx: range(n_runs) for cell_idx in range(len(cells))}
+    units = [(cell_idx, run_id, cells[cell_idx], seed, n_firms, n_periods, strategy, burn_in, precision,
+              backend, trajectory_dir, None)
+             for cell_idx, runs in run_ranges.items() for run_id in runs]
+    dtype = np.dtype(precision)
+    results = {cell_idx: (np.empty((len(runs), n_firms), dtype=dtype),
+                          np.empty((len(runs), n_firms), dtype=dtype), runs.start)
+               for cell_idx, runs in run_ranges.items()}
+
+    def store(unit, mean_perf, risk):
+        cell_idx, run_id = unit[:2]
+        perf, risk_out, start = results[cell_idx]
+        perf[run_id - start] = mean_perf
+        risk_out[run_id - start] = risk
+        if on_unit is not None:
+            on_unit(cell_idx)
+
+    run_units(units, workers=workers, cache=cache, on_result=store)
+    return {cell_idx: (perf, risk) for cell_idx, (perf, risk, _) in results.items()}
+
+def run_units(units, workers=None, cache=None, on_result=None):
+    """Simulate a list of work units (see _run_unit) on a process pool.
+
+    Cached units are loaded instead of simulated and new results are cached as
+    they finish. on_result(unit, mean_perf, risk) is called for every unit,
+    cached ones first, then in submission order.
+    """
+    if cache is not None:
+        missing = []
+        for unit in units:
+            hit = cache.get(unit_params(unit))
+            if hit is None:
+                missing.append(unit)
+            elif on_result is not None:
+                on_result(unit, hit["mean_perf"], hit["risk"])
+        units = missing
+    if not units:
+        return
+
+    if workers == 1:
+        _collect(units, map(_run_unit, units), cache, on_result)
+    else:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(units) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            _collect(units, pool.map(_run_unit, units, chunksize=chunksize), cache, on_result)
+
+def _collect(units, outputs, cache=None, on_result=None):
+    # map() yields in submission order
+    for unit, (mean_perf, risk) in zip(units, outputs):
+        if cache is not None:
+            cache.put(unit_params(unit), mean_perf=mean_perf, risk=risk)
+        if on_result is not None:
+            on_result(unit, mean_perf, risk)
@@ -3,62 +3,74 @@ plotting.py – Visualization utilities for Dong (2020) SMJ replication.
 Generates Table 1-style plots, factor summaries, and dynamic trends.
 """
 
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 import seaborn as sns
 from pathlib import Path
+from src.instrumentation import phase
 
-# Output directory
+# Output directory (created on the first save)
 out_dir = Path(__file__).resolve().parents[1] / "outputs"
-out_dir.mkdir(exist_ok=True)
 
 sns.set(style="whitegrid", font_scale=1.1)
 
+# bump when a change to the figure code should invalidate the stored input hashes
+PLOT_VERSION = 2
+
 
 # ---------- Basic Plot Utilities ----------
-def save_and_close(fig, name):
-    """Helper to save figure and close."""
-    path = out_dir / f"{name}.png"
+def save_and_close(fig, name, directory=None):
+    """Helper to save figure and close (into directory, default out_dir)."""
+    directory = Path(directory) if directory is not None else out_dir
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.png"
     fig.savefig(path, dpi=300, bbox_inches="tight")
     plt.close(fig)
     print(f"✅ Saved {name}.png")
 
 
 # ---------- Aspiration Effects ----------
-def plot_aspiration_effects(asp_summary):
+def plot_aspiration_effects(asp_summary, directory=None):
     """Group mean differences (Perf_diff / Risk_diff) by Aspiration type."""
     fig, ax = plt.subplots(1, 2, figsize=(12, 5))
     metrics = [("Perf_diff", "Blues_d"), ("Risk_diff", "Reds_d")]
 
     for i, (metric, palette) in enumerate(metrics):
-        sns.barplot(data=asp_summary, x="Aspiration", y=metric, palette=palette, ax=ax[i])
+        sns.barplot(data=asp_summary, x="Aspiration", y=metric, palette=palette, errorbar=None, ax=ax[i])
         ax[i].axhline(0, color="gray", linestyle="--")
         ax[i].set_title(f"Group Mean Difference ({metric.replace('_diff','')}) by Aspiration Type")
         ax[i].set_xlabel("Aspiration Type")
         ax[i].set_ylabel("Group Mean Difference")
 
     plt.tight_layout()
-    save_and_close(fig, "aspiration_effects_diff")
+    save_and_close(fig, "aspiration_effects_diff", directory)
 
 
 # ---------- Uncertainty Effects ----------
-def plot_uncertainty_effects(tech_summary, market_summary):
+def plot_uncertainty_effect(factor, df_summary, directory=None):
+    """Performance & Risk differences by level of one uncertainty factor ("tech_uncertainty_effects" / "market_...")."""
+    fig, ax = plt.subplots(1, 2, figsize=(12, 5))
+    for i, (metric, palette) in enumerate([("Perf_diff", "Blues"), ("Risk_diff", "Reds")]):
+        sns.barplot(data=df_summary, x="Level", y=metric, palette=palette, errorbar=None, ax=ax[i])
+        ax[i].axhline(0, color="gray", linestyle="--")
+        ax[i].set_ylabel("Group Mean Difference")
+        ax[i].set_title(f"{metric.replace('_diff','')} Difference by {factor.split('_')[0].capitalize()} Uncertainty")
+    plt.tight_layout()
+    save_and_close(fig, factor, directory)
+
+
+def plot_uncertainty_effects(tech_summary, market_summary, directory=None):
     """Performance & Risk under Technological and Market Uncertainty."""
-    for factor, df_summary in {
-        "tech_uncertainty_effects": tech_summary,
-        "market_uncertainty_effects": market_summary,
-    }.items():
-        fig, ax = plt.subplots(1, 2, figsize=(12, 5))
-        for i, (metric, palette) in enumerate([("Perf_diff", "Blues"), ("Risk_diff", "Reds")]):
-            sns.barplot(data=df_summary, x="Level", y=metric, palette=palette, ax=ax[i])
-            ax[i].axhline(0, color="gray", linestyle="--")
-            ax[i].set_ylabel("Group Mean Difference")
-            ax[i].set_title(f"{metric.replace('_diff','')} Difference by {factor.split('_')[0].capitalize()} Uncertainty")
-        plt.tight_layout()
-        save_and_close(fig, factor)
+    plot_uncertainty_effect("tech_uncertainty_effects", tech_summary, directory)
+    plot_uncertainty_effect("market_uncertainty_effects", market_summary, directory)
 
 
 # ---------- ANOVA Heatmap ----------
-def plot_table1_heatmap(anova_df):
+def plot_table1_heatmap(anova_df, directory=None):
     """Visualize ANOVA F values as heatmap."""
     df = anova_df[~anova_df["Source"].str.contains("Residual", na=False)]
     pivot = df.pivot(index="Source", columns="Metric", values="F value")
@@ -66,40 +78,193 @@ def plot_table1_heatmap(anova_df):
     sns.heatmap(pivot, annot=True, fmt=".2f", cmap="coolwarm", cbar_kws={"label": "F value"})
     plt.title("Table 1-style ANOVA Summary (F values)")
     plt.tight_layout()
-    save_and_close(plt.gcf(), "table1_anova_heatmap")
+    save_and_close(plt.gcf(), "table1_anova_heatmap", directory)
 
 
 # ---------- Dynamic Trends ----------
-def plot_dynamic_trends(df):
-    """Performance & Risk dynamics across simulation runs."""
-    trend_df = (df.groupby(["Run_ID", "Aspiration"])[["Performance", "Risk"]]
-                  .mean()
-                  .reset_index())
+def dynamic_trend_summary(df, confidence=0.95):
+    """
+    Running mean of Performance & Risk per Aspiration over runs 0..Run_ID, with
+    a normal-theory CI computed from run-level means (mean ± z·sd/√runs).
+
+    Firms of one run share its shocks and peer dynamics, so a run, not a firm,
+    is the independent unit (as in src.inference): each run is first reduced
+    to its mean over the firms of the aspiration's cells.
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    runs = (df.groupby(["Aspiration", "Run_ID"], observed=True)[["Performance", "Risk"]]
+            .mean().sort_index().reset_index())
+    by_asp = runs.groupby("Aspiration", observed=True)
+    k = by_asp.cumcount().to_numpy() + 1
+    summary = runs[["Run_ID", "Aspiration"]].copy()
+    for metric in ["Performance", "Risk"]:
+        total = by_asp[metric].cumsum().to_numpy()
+        total_sq = (runs[metric] ** 2).groupby(runs["Aspiration"], observed=True).cumsum().to_numpy()
+        mean = total / k
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sd = np.sqrt(np.maximum(total_sq - k * mean ** 2, 0) / (k - 1))
+        half = np.where(k > 1, z * sd / np.sqrt(k), np.nan)
+        summary[metric] = mean
+        summary[f"{metric}_ci_low"] = mean - half
+        summary[f"{metric}_ci_high"] = mean + half
+    return summary
+
+
+def plot_dynamic_trends(trend_df, directory=None):
+    """Running mean Performance & Risk across simulation runs, with run-level CIs.
+
+    trend_df is the output of dynamic_trend_summary(); a per-firm result table
+    is summarised first.
+    """
+    if "Performance_ci_low" not in trend_df.columns:
+        trend_df = dynamic_trend_summary(trend_df)
 
     fig, ax = plt.subplots(1, 2, figsize=(14, 5))
     for i, metric in enumerate(["Performance", "Risk"]):
-        sns.lineplot(data=trend_df, x="Run_ID", y=metric, hue="Aspiration", marker="o", ax=ax[i])
+        for asp, group in trend_df.groupby("Aspiration", observed=True):
+            line, = ax[i].plot(group["Run_ID"], group[metric], marker="o", label=asp)
+            ax[i].fill_between(group["Run_ID"], group[f"{metric}_ci_low"], group[f"{metric}_ci_high"],
+                               color=line.get_color(), alpha=0.2)
+        ax[i].legend(title="Aspiration")
         ax[i].set_title(f"{metric} Dynamics across Simulation Runs")
         ax[i].set_xlabel("Simulation Run")
-        ax[i].set_ylabel(f"Mean {metric}")
+        ax[i].set_ylabel(f"Running Mean {metric} (run-level CI)")
+
+    plt.tight_layout()
+    save_and_close(fig, "dynamic_trends", directory)
+
+
+def period_dynamics_summary(store):
+    """Mean performance and search rate per (Aspiration, Period) from a TrajectoryStore (or its path)."""
+    if not hasattr(store, "period_means"):
+        from src.trajectories import TrajectoryStore
+        store = TrajectoryStore.open(store)
+    # every cell holds the same runs x firms, so the mean of cell means is the group mean
+    frames = [store.period_means(field).groupby(["Aspiration", "Period"], observed=True)[field].mean()
+              for field in ("performance", "search")]
+    return pd.concat(frames, axis=1).reset_index()
+
+
+def plot_period_dynamics(summary, directory=None):
+    """Mean performance and search rate over simulated periods.
+
+    summary is the output of period_dynamics_summary(); a TrajectoryStore or
+    its path is summarised first.
+    """
+    if not isinstance(summary, pd.DataFrame):
+        summary = period_dynamics_summary(summary)
+
+    fig, ax = plt.subplots(1, 2, figsize=(14, 5))
+    for i, (field, label) in enumerate([("performance", "Mean Performance"), ("search", "Share of Firms Searching")]):
+        sns.lineplot(data=summary, x="Period", y=field, hue="Aspiration", errorbar=None, ax=ax[i])
+        ax[i].set_title(f"{label} over Time")
+        ax[i].set_xlabel("Period")
+        ax[i].set_ylabel(label)
 
     plt.tight_layout()
-    save_and_close(fig, "dynamic_trends")
+    save_and_close(fig, "period_dynamics", directory)
+
+
+# ---------- Render Pipeline ----------
+FIGURES = {
+    "aspiration_effects_diff": plot_aspiration_effects,
+    "tech_uncertainty_effects": lambda summary, directory=None: plot_uncertainty_effect(
+        "tech_uncertainty_effects", summary, directory),
+    "market_uncertainty_effects": lambda summary, directory=None: plot_uncertainty_effect(
+        "market_uncertainty_effects", summary, directory),
+    "table1_anova_heatmap": plot_table1_heatmap,
+    "dynamic_trends": plot_dynamic_trends,
+    "period_dynamics": plot_period_dynamics,
+}
+
+
+def summary_hash(name, summary):
+    """SHA-256 of a figure's name, PLOT_VERSION and the contents of its input summary table."""
+    digest = hashlib.sha256(f"{name}|{PLOT_VERSION}|{list(summary.columns)}|{list(summary.dtypes.astype(str))}".encode())
+    digest.update(pd.util.hash_pandas_object(summary, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _hash_path(name, directory):
+    return directory / f"{name}.png.sha256"
+
+
+def is_up_to_date(name, digest, directory=None):
+    """True if <directory>/<name>.png exists and was rendered from a summary with this hash."""
+    directory = Path(directory) if directory is not None else out_dir
+    path = _hash_path(name, directory)
+    return (directory / f"{name}.png").exists() and path.exists() and path.read_text().strip() == digest
+
+
+def _render(job):
+    """Draw one figure into the job's directory (executed in a worker)."""
+    name, summary, directory = job
+    FIGURES[name](summary, directory=directory)
+    return name
+
+
+def render_figures(summaries, workers=1, force=False, directory=None):
+    """
+    Render {figure name: summary table} into directory (default out_dir).
+
+    Figures whose summary hash matches the one stored next to the PNG are
+    skipped unless force is set. workers > 1 draws the figures in that many
+    processes (workers=None uses one per figure). Returns the rendered names.
+    The default is in-process: a worker has to import matplotlib and seaborn
+    afresh (about 1.5 s), longer than one of these figures takes to draw, so
+    processes only pay off with many cores and many or heavy figures.
+    """
+    directory = Path(directory) if directory is not None else out_dir
+    jobs = []
+    for name, summary in summaries.items():
+        digest = summary_hash(name, summary)
+        if not force and is_up_to_date(name, digest, directory):
+            print(f"⏭️ {name}.png is up to date")
+            continue
+        jobs.append((name, summary, digest))
+    if not jobs:
+        return []
+
+    tasks = [(name, summary, directory) for name, summary, _ in jobs]
+    if workers == 1 or len(jobs) == 1:
+        rendered = [_render(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers or len(jobs), len(jobs))) as pool:
+            rendered = list(pool.map(_render, tasks))
+    for name, _, digest in jobs:
+        _hash_path(name, directory).write_text(digest)
+    return rendered
 
 
 # ---------- Main Interface ----------
 def plot_results(df, anova_df=None, asp_summary=None,
-                 tech_summary=None, market_summary=None):
-    """Generate all relevant figures."""
-    if asp_summary is not None:
-        plot_aspiration_effects(asp_summary)
-    if tech_summary is not None and market_summary is not None:
-        plot_uncertainty_effects(tech_summary, market_summary)
-    if anova_df is not None:
-        plot_table1_heatmap(anova_df)
-
-    # Optional dynamic trend
-    if "Run_ID" in df.columns:
-        plot_dynamic_trends(df)
-
-    print(f"📁 All plots saved to {out_dir.resolve()}")
\ No newline at end of file
+                 tech_summary=None, market_summary=None, trajectories=None,
+                 workers=1, force=False, directory=None):
+    """Generate all relevant figures.
+
+    Every figure is drawn from a small summary table; the per-firm df is only
+    reduced once, to the run-level trend summary (df may be None to skip it).
+    trajectories (a TrajectoryStore or its directory, e.g. df.attrs["trajectory_dir"])
+    adds the per-period dynamics plot. Figures are rendered by render_figures():
+    in workers processes (in-process by default, see there), skipping those
+    whose inputs are unchanged unless force, into directory (default out_dir).
+    """
+    with phase("plotting"):
+        summaries = {}
+        if asp_summary is not None:
+            summaries["aspiration_effects_diff"] = asp_summary
+        if tech_summary is not None and market_summary is not None:
+            summaries["tech_uncertainty_effects"] = tech_summary
+            summaries["market_uncertainty_effects"] = market_summary
+        if anova_df is not None:
+            summaries["table1_anova_heatmap"] = anova_df
+
+        # Optional dynamic trend
+        if df is not None and "Run_ID" in df.columns:
+            summaries["dynamic_trends"] = dynamic_trend_summary(df)
+        if trajectories is not None:
+            summaries["period_dynamics"] = period_dynamics_summary(trajectories)
+
+        render_figures(summaries, workers=workers, force=force, directory=directory)
+
+    print(f"📁 All plots saved to {Path(directory or out_dir).resolve()}")
\ No newline at end of file
@@ -0,0 +1,313 @@
+# src/shards.py
+
+### sharded execution across machines sharing a filesystem ###
+
+"""
+Usage (from the project root, on any number of machines sharing root):
+
+    python -m src.shards plan  runs/paper --firms 200 --periods 1000 --runs 1000 --runs-per-shard 50
+    python -m src.shards work  runs/paper --workers 8        # start one or more per machine
+    python -m src.shards status runs/paper
+    python -m src.shards merge runs/paper --output runs/paper/results.pkl
+
+The manifest lists every (cell, run range, seed) shard of the grid. Workers
+claim shards by creating locks/<shard>.lock with O_CREAT | O_EXCL, which
+succeeds for exactly one process, simulate the shard's seeded units (the
+same units run_experiment(workers=...) simulates) and write
+shards/<shard>.npz under a temporary name before renaming it into place.
+A finished shard is never claimed again. While a worker simulates a shard
+it touches the lock every --heartbeat seconds, so locks not touched for
+--stale-after seconds belong to dead workers and are re-claimed: the stale
+lock is first renamed to a unique name (atomic, so only one worker wins) and
+then created afresh. Since every unit is seeded
+by its (cell, run) position, a shard simulated twice gives the same file,
+and the merged table is identical to a single-node run with the same seed.
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+import numpy as np
+
+from src.config import SEED
+from src.simulation import experiment_cells, ResultColumns, run_experiment, state_dtype
+from src.parallel import run_cells_parallel
+from src.cli import EXTENSIONS, write_table
+
+MANIFEST_VERSION = 1
+HEARTBEAT_SECONDS = 30.0
+
+
+def _paths(root):
+    root = Path(root)
+    return root / "manifest.json", root / "shards", root / "locks"
+
+
+def create_manifest(root, n_firms, n_periods, strategy, n_runs, seed=SEED, burn_in=0,
+                    runs_per_shard=50, precision="float64"):
+    """Write root/manifest.json listing every (cell, run range, seed) shard; returns the manifest."""
+    state_dtype(precision)
+    manifest_path, shard_dir, lock_dir = _paths(root)
+    if manifest_path.exists():
+        raise FileExistsError(f"{manifest_path} already exists")
+    cells = experiment_cells()
+    shards = [{"id": f"cell{cell_idx:02d}-runs{lo:05d}-{min(lo + runs_per_shard, n_runs):05d}",
+               "cell_idx": cell_idx, "cell": list(cell),
+               "runs": [lo, min(lo + runs_per_shard, n_runs)], "seed": seed}
+              for cell_idx, cell in enumerate(cells) for lo in range(0, n_runs, runs_per_shard)]
+    manifest = {"version": MANIFEST_VERSION, "n_firms": n_firms, "n_periods": n_periods,
+                "strategy": strategy, "n_runs": n_runs, "seed": seed, "burn_in": burn_in,
+                "precision": precision, "cells": [list(cell) for cell in cells], "shards": shards}
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def load_manifest(root):
+    manifest_path, _, _ = _paths(root)
+    manifest = json.loads(manifest_path.read_text())
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"{manifest_path} has manifest version {manifest.get('version')}, "
+                         f"this code reads version {MANIFEST_VERSION}")
+    return manifest
+
+
+def _reclaim(lock, worker_id, stale_after):
+    """Remove lock if it has not been touched for stale_after seconds.
+
+    The lock is renamed to a unique name first, which only one worker can do.
+    If the renamed file turns out to be a fresh lock (another worker reclaimed
+    and re-created it between our stat and rename), it is put back.
+    """
+    try:
+        seen = lock.stat()
+    except FileNotFoundError:
+        return
+    if time.time() - seen.st_mtime <= stale_after:
+        return
+    grave = lock.with_name(f"{lock.name}.{worker_id}.{time.time_ns()}.stale")
+    try:
+        os.rename(lock, grave)
+    except FileNotFoundError:  # reclaimed by another worker
+        return
+    moved = grave.stat()
+    if moved.st_ino != seen.st_ino or time.time() - moved.st_mtime <= stale_after:
+        try:
+            os.link(grave, lock)
+        except FileExistsError:
+            pass
+    grave.unlink(missing_ok=True)
+
+
+class _Heartbeat:
+    """Touches a lock file every interval seconds while the block runs."""
+
+    def __init__(self, lock, interval):
+        self.lock = lock
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self):
+        while not self._stop.wait(self.interval):
+            try:
+                os.utime(self.lock)
+            except FileNotFoundError:
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _claim(lock, worker_id, stale_after):
+    """Create the lock file atomically; True if this worker now owns the shard."""
+    if stale_after is not None:
+        _reclaim(lock, worker_id, stale_after)
+    try:
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        json.dump({"worker": worker_id, "claimed": time.time()}, f)
+    return True
+
+
+def work(root, worker_id=None, workers=1, backend="numpy", cache_dir=None, stale_after=None,
+         max_shards=None, heartbeat=HEARTBEAT_SECONDS):
+    """Claim and simulate shards of the manifest in root until none is left.
+
+    workers is the process count used within each shard (see run_cells_parallel).
+    The lock of the shard in progress is touched every heartbeat seconds;
+    stale_after (if set) must be well above the heartbeat of every worker.
+    Returns the ids of the shards this worker completed.
+    """
+    if stale_after is not None and stale_after <= 2 * heartbeat:
+        raise ValueError("stale_after must exceed twice the heartbeat interval")
+    manifest = load_manifest(root)
+    _, shard_dir, lock_dir = _paths(root)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    cells = [tuple(cell) for cell in manifest["cells"]]
+    cache = None
+    if cache_dir is not None:
+        from src.cache import ResultCache
+        cache = ResultCache(cache_dir)
+
+    done = []
+    for shard in manifest["shards"]:
+        if max_shards is not None and len(done) >= max_shards:
+            break
+        out = shard_dir / f"{shard['id']}.npz"
+        lock = lock_dir / f"{shard['id']}.lock"
+        if out.exists() or not _claim(lock, worker_id, stale_after):
+            continue
+        if out.exists():  # finished by another worker between the check and the claim
+            lock.unlink(missing_ok=True)
+            continue
+        lo, hi = shard["runs"]
+        cell_idx = shard["cell_idx"]
+        with _Heartbeat(lock, heartbeat):
+            results = run_cells_parallel(cells, n_firms=manifest["n_firms"], n_periods=manifest["n_periods"],
+                                         strategy=manifest["strategy"], n_runs=manifest["n_runs"],
+                                         workers=workers, seed=shard["seed"], burn_in=manifest["burn_in"],
+                                         cache=cache, backend=backend, precision=manifest["precision"],
+                                         run_ranges={cell_idx: range(lo, hi)})
+        mean_perf, risk = results[cell_idx]
+        tmp = out.with_name(f"{out.stem}.{worker_id}.tmp.npz")
+        np.savez(tmp, mean_perf=mean_perf, risk=risk)
+        os.replace(tmp, out)
+        lock.unlink(missing_ok=True)
+        done.append(shard["id"])
+        print(f"✅ [{worker_id}] shard {shard['id']} done", flush=True)
+    return done
+
+
+def status(root):
+    """Counts of done, claimed and pending shards, plus the ids not yet done."""
+    manifest = load_manifest(root)
+    _, shard_dir, lock_dir = _paths(root)
+    done, claimed, pending = [], [], []
+    for shard in manifest["shards"]:
+        if (shard_dir / f"{shard['id']}.npz").exists():
+            done.append(shard["id"])
+        elif (lock_dir / f"{shard['id']}.lock").exists():
+            claimed.append(shard["id"])
+        else:
+            pending.append(shard["id"])
+    return {"done": len(done), "claimed": len(claimed), "pending": len(pending),
+            "total": len(manifest["shards"]), "missing": claimed + pending}
+
+
+def merge(root):
+    """Concatenate all shard files into the per-firm result table of run_experiment."""
+    manifest = load_manifest(root)
+    _, shard_dir, _ = _paths(root)
+    missing = status(root)["missing"]
+    if missing:
+        raise RuntimeError(f"{len(missing)} shard(s) not finished, e.g. {missing[:3]}")
+    cells = [tuple(cell) for cell in manifest["cells"]]
+    n_runs, n_firms = manifest["n_runs"], manifest["n_firms"]
+    dtype = state_dtype(manifest["precision"])
+    perf = {c: np.empty((n_runs, n_firms), dtype=dtype) for c in range(len(cells))}
+    risk = {c: np.empty((n_runs, n_firms), dtype=dtype) for c in range(len(cells))}
+    for shard in manifest["shards"]:
+        lo, hi = shard["runs"]
+        with np.load(shard_dir / f"{shard['id']}.npz") as data:
+            perf[shard["cell_idx"]][lo:hi] = data["mean_perf"]
+            risk[shard["cell_idx"]][lo:hi] = data["risk"]
+    columns = ResultColumns(cells, manifest["strategy"], n_runs, n_firms, dtype=dtype)
+    for c in range(len(cells)):
+        columns.set_cell(c, perf[c], risk[c])
+    df = columns.to_frame()
+    print(f"\n📊 Raw data for ANOVA - Shape: {df.shape}")
+    return df
+
+
+def check_shards(n_firms=20, n_periods=50, strategy="stepwise", n_runs=10, n_procs=3,
+                 runs_per_shard=3, seed=SEED):
+    """Run a small grid with n_procs local worker processes and compare the merge to a single-node run.
+
+    Returns True if the merged table equals run_experiment(..., workers=1, seed=seed).
+    """
+    with tempfile.TemporaryDirectory() as root:
+        create_manifest(root, n_firms, n_periods, strategy, n_runs, seed=seed,
+                        runs_per_shard=runs_per_shard)
+        procs = [subprocess.Popen([sys.executable, "-m", "src.shards", "work", root,
+                                   "--worker-id", f"local{i}"], stdout=subprocess.DEVNULL,
+                                  cwd=Path(__file__).resolve().parents[1])
+                 for i in range(n_procs)]
+        if any(p.wait() for p in procs):
+            raise RuntimeError("a local shard worker failed")
+        merged = merge(root)
+    reference = run_experiment(n_firms, n_periods, strategy, n_runs, workers=1, seed=seed)
+    return merged.equals(reference)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sharded execution of the experiment grid")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    plan = commands.add_parser("plan", help="write the shard manifest")
+    plan.add_argument("root", type=Path)
+    plan.add_argument("--firms", type=int, required=True)
+    plan.add_argument("--periods", type=int, required=True)
+    plan.add_argument("--runs", type=int, required=True)
+    plan.add_argument("--strategy", default="stepwise", choices=["stepwise", "ambitious", "conservative"])
+    plan.add_argument("--seed", type=int, default=SEED)
+    plan.add_argument("--burn-in", type=int, default=0)
+    plan.add_argument("--runs-per-shard", type=int, default=50)
+    plan.add_argument("--precision", default="float64", choices=["float64", "float32"])
+
+    worker = commands.add_parser("work", help="claim and simulate shards until none is left")
+    worker.add_argument("root", type=Path)
+    worker.add_argument("--worker-id")
+    worker.add_argument("--workers", type=int, default=1, help="processes per shard")
+    worker.add_argument("--backend", default="numpy", choices=["numpy", "numba"])
+    worker.add_argument("--cache-dir", type=Path)
+    worker.add_argument("--stale-after", type=float,
+                        help="re-claim locks not touched for this many seconds (> 2x --heartbeat)")
+    worker.add_argument("--heartbeat", type=float, default=HEARTBEAT_SECONDS,
+                        help="seconds between touches of the lock of the shard in progress")
+    worker.add_argument("--max-shards", type=int)
+
+    report = commands.add_parser("status", help="count done / claimed / pending shards")
+    report.add_argument("root", type=Path)
+
+    combine = commands.add_parser("merge", help="concatenate the shards into one result table")
+    combine.add_argument("root", type=Path)
+    combine.add_argument("--output", type=Path, help=".pkl (default), .csv, .parquet or .json")
+    combine.add_argument("--format", choices=list(EXTENSIONS), help="default: from the --output suffix")
+
+    args = parser.parse_args(argv)
+    if args.command == "plan":
+        manifest = create_manifest(args.root, args.firms, args.periods, args.strategy, args.runs,
+                                   seed=args.seed, burn_in=args.burn_in,
+                                   runs_per_shard=args.runs_per_shard, precision=args.precision)
+        print(f"📝 {len(manifest['shards'])} shards written to {args.root / 'manifest.json'}")
+    elif args.command == "work":
+        done = work(args.root, worker_id=args.worker_id, workers=args.workers, backend=args.backend,
+                    cache_dir=args.cache_dir, stale_after=args.stale_after, max_shards=args.max_shards,
+                    heartbeat=args.heartbeat)
+        print(f"🏁 {len(done)} shard(s) completed")
+    elif args.command == "status":
+        counts = status(args.root)
+        print(f"{counts['done']}/{counts['total']} done, {counts['claimed']} claimed, {counts['pending']} pending")
+    else:
+        write_table(merge(args.root), args.output or args.root / "results.pkl", args.format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,116 +3,596 @@ import numpy as np
 import pandas as pd
 from src.aspirations import *
 from src.config import *
+from src.accumulators import RunningMoments
+from src.instrumentation import phase, count, ProgressTracker
 
-def compute_peer_perf(i, P, strategy="stepwise"):
+def compute_peer_perf(i, P, strategy="stepwise", percentile=PERCENTILE_STEPWISE):
     """Compute reference group performance for firm i based on chosen strategy."""
     n = len(P)
     if strategy == "conservative":
         return np.mean(P)
     elif strategy == "stepwise":
-        num_ref = max(1, int(PERCENTILE_STEPWISE * n))
+        num_ref = max(1, int(percentile * n))
         diffs = np.abs(P - P[i])
-        idx = np.argsort(diffs)[1:num_ref+1]
+        idx = np.argsort(diffs, kind="stable")[1:num_ref+1]
         return np.mean(P[idx])
     elif strategy == "ambitious":
-        num_ref = max(1, int(PERCENTILE_STEPWISE * n))
+        num_ref = max(1, int(percentile * n))
         top_idx = np.argsort(P)[-num_ref:]
         return np.mean(P[top_idx])
     else:
         raise ValueError(f"Unknown strategy: {strategy}")
 
-def run_single_simulation(aspiration_type, d, v, strategy="stepwise",
-                          n_firms=NUM_ORG, n_periods=NUM_PERIOD):
+def compute_peer_perfs(P, strategy="stepwise", percentile=PERCENTILE_STEPWISE, network=None):
+    """Compute reference group performance for all firms at once.
+
+    Same result as calling compute_peer_perf for every firm, but P is sorted
+    once per period. For "stepwise" each firm's nearest peers form a contiguous
+    window of the sorted values; the window is located by a binary search run
+    for all firms together and summed with prefix sums, O(n log n) overall.
+    Equidistant peers are ranked by firm index, as in a stable argsort.
+    A population of one firm has no stepwise peers and gets NaN, as in
+    compute_peer_perf (tests/test_peers.py checks both against each other).
+    P may also be a (runs, firms) array, each row being a separate population.
+    float32 input gives float32 output; stepwise windows are summed in float64.
+    strategy="network" takes the weighted mean over each firm's peers in
+    network (a networks.PeerNetwork), one sparse product for all rows.
+    """
+    if strategy == "network":
+        if network is None:
+            raise ValueError('strategy="network" needs a PeerNetwork (network=...)')
+        return network.peer_means(P)
+    P = np.asarray(P, dtype=np.result_type(P, np.float32))
+    shape = P.shape
+    P = P.reshape(-1, shape[-1])
+    r, n = P.shape
+    if strategy == "conservative":
+        return np.repeat(P.mean(axis=1), n).reshape(shape)
+
+    num_ref = max(1, int(percentile * n))
+    order = np.argsort(P, axis=1, kind="stable")
+    s = np.take_along_axis(P, order, axis=1)
+    if strategy == "ambitious":
+        return np.repeat(s[:, -num_ref:].mean(axis=1), n).reshape(shape)
+    elif strategy != "stepwise":
+        raise ValueError(f"Unknown strategy: {strategy}")
+
+    k = min(num_ref, n - 1)  # argsort(...)[1:num_ref+1] holds at most n-1 peers
+    if k < 1:
+        return np.full(shape, np.nan)
+
+    # work on flat indices: row offset + position within the sorted row
+    base = (np.arange(r) * n)[:, None]
+    cols = np.broadcast_to(np.arange(n), (r, n))
+    s = s.ravel()
+    pos = np.empty((r, n), dtype=np.intp)
+    np.put_along_axis(pos, order, cols, axis=1)
+    x = P.ravel()
+
+    # equal values below a firm are taken lowest index first, i.e. from the
+    # inside of the window outwards: rank them by reversed index within the group
+    new_group = np.ones((r, n), dtype=bool)
+    new_group[:, 1:] = s.reshape(r, n)[:, 1:] != s.reshape(r, n)[:, :-1]
+    group_lo = np.maximum.accumulate(np.where(new_group, cols, 0), axis=1)
+    last_of_group = np.ones((r, n), dtype=bool)
+    last_of_group[:, :-1] = new_group[:, 1:]
+    group_hi = np.minimum.accumulate(np.where(last_of_group, cols, n - 1)[:, ::-1], axis=1)[:, ::-1]
+    left_rank = np.take_along_axis(order, group_lo + group_hi - cols, axis=1).ravel()
+    order = order.ravel()
+
+    # window of k+1 sorted values (the firm itself plus k peers) starting at lo
+    lo = (base + np.maximum(pos - k, 0)).ravel()
+    hi = (base + np.minimum(pos, n - k - 1)).ravel()
+    active = np.flatnonzero(lo < hi)
+    while active.size:
+        mid = (lo[active] + hi[active]) // 2
+        # slide right while the leftmost value is farther than the next one on the right
+        left_gap = x[active] - s[mid]
+        right_gap = s[mid + k + 1] - x[active]
+        move = (left_gap > right_gap) | ((left_gap == right_gap) & (left_rank[mid] > order[mid + k + 1]))
+        lo[active] = np.where(move, mid + 1, lo[active])
+        hi[active] = np.where(move, hi[active], mid)
+        active = active[lo[active] < hi[active]]
+
+    csum = np.zeros((r, n + 1))
+    np.cumsum(s.reshape(r, n), axis=1, out=csum[:, 1:])
+    csum = csum.ravel()
+    start = lo + (lo // n)  # each csum row is one longer than a row of s
+    window_sum = csum[start + k + 1] - csum[start]
+    return ((window_sum - x) / k).astype(P.dtype, copy=False).reshape(shape)
+
+def state_dtype(precision):
+    """NumPy dtype of the simulation state for a precision name in PRECISIONS."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}")
+    return np.dtype(precision)
+
+def _simulate_runs(aspiration_type, d, v, strategy, n_firms, n_periods, n_runs,
+                   burn_in=0, return_trajectory=False, rng=None, backend="numpy",
+                   recorder=None, precision="float64", gamma=GAMMA, mu=MU, w=W,
+                   percentile=PERCENTILE_STEPWISE, network=None):
+    """Advance n_runs independent populations together as (runs, firms) arrays.
+
+    Random draws come from rng (a np.random.Generator) or, if None, from the
+    global np.random state. backend="numba" runs the period loop in the
+    compiled kernel of src.kernels, which needs a Generator; with rng=None one
+    is seeded from the global state.
+
+    Performance is summarised on the fly by a RunningMoments accumulator that
+    skips the first burn_in periods. Returns the accumulator and, only if
+    return_trajectory is set, the performance records with shape
+    (n_periods, n_runs, n_firms).
+    recorder, if given, is called every period as recorder(t, P_t, A_t, search)
+    with (runs, firms) arrays, e.g. a TrajectoryStore.recorder (numpy backend only).
+    precision="float32" keeps all state, the accumulator and the records in
+    float32 (numpy backend only); the random draws are the same float64 values,
+    rounded, so the stream is consumed exactly as in float64.
+    gamma, mu, w and percentile (PERCENTILE_STEPWISE) default to src.config.
+    strategy="network" takes peers from network, a networks.PeerNetwork over
+    the n_firms firms (numpy backend only); all runs share the graph, and if
+    it rewires, the rewiring draws come from rng before the period's peer step.
+    """
+    if burn_in >= n_periods:
+        raise ValueError("burn_in must be smaller than n_periods")
+    if backend != "numpy":
+        from src import kernels  # Numba is imported only when the compiled backend is asked for
+        backend = kernels.resolve_backend(backend)
+    if strategy == "network":
+        if network is None:
+            raise ValueError('strategy="network" needs a PeerNetwork (network=...)')
+        if network.n_firms != n_firms:
+            raise ValueError(f"network has {network.n_firms} firms, expected {n_firms}")
+        if backend != "numpy":
+            raise ValueError("the network strategy needs the numpy backend")
+    if recorder is not None and backend != "numpy":
+        raise ValueError("trajectory recording needs the numpy backend")
+    dtype = state_dtype(precision)
+    if dtype != np.float64 and backend != "numpy":
+        raise ValueError("float32 precision needs the numpy backend")
+    if rng is None:
+        rng = np.random if backend == "numpy" else np.random.default_rng(np.random.randint(2**63 - 1))
+    shape = (n_runs, n_firms)
     # ---- initialization ----
-    T = np.random.randn(n_firms)
-    M = np.random.randn(n_firms)
+    T = rng.standard_normal(shape).astype(dtype, copy=False)
+    M = rng.standard_normal(shape).astype(dtype, copy=False)
     P = T + M
-    A0 = np.random.randn(n_firms)  # Initial aspirations
-
-    # Initialize aspiration objects
-    if aspiration_type == "historical":
-        aspirations = [HistoricalAspiration(a) for a in A0]
-    elif aspiration_type == "social":
-        aspirations = [SocialAspiration(a) for a in A0]
-    elif aspiration_type == "mixed":
-        aspirations = [MixedAspiration(a) for a in A0]
-    elif aspiration_type == "switching":
-        aspirations = [SwitchingAspiration(a) for a in A0]
-    else:
-        raise ValueError("Unknown aspiration type")
+    A0 = rng.standard_normal(shape).astype(dtype, copy=False)  # Initial aspirations
+
+    count("firm_periods", n_periods * n_runs * n_firms)
+    if backend == "numba":
+        with phase("compiled_kernel"):
+            mean, m2, performance_records = kernels.simulate_runs(
+                T, M, A0, aspiration_type, d, v, strategy, n_periods, burn_in,
+                return_trajectory, rng, gamma, mu, w, percentile)
+        moments = RunningMoments.from_state(mean, m2, n_periods - burn_in, burn_in=burn_in)
+        return moments, performance_records
 
-    performance_records = []
+    # Initialize aspirations of all firms as one array
+    aspirations = AspirationVector(aspiration_type, A0, dtype=dtype, gamma=gamma, mu=mu, w=w)
+
+    moments = RunningMoments(shape, burn_in=burn_in, dtype=dtype)
+    performance_records = np.empty((n_periods,) + shape, dtype=dtype) if return_trajectory else None
 
     # ---- simulate over time ----
-    for _ in range(n_periods):
+    for t in range(n_periods):
         # Market update (independent of decision)
-        new_M = v * M + (1 - v) * np.random.randn(n_firms)
-        new_T = np.zeros(n_firms)
+        with phase("market_update"):
+            new_M = v * M + (1 - v) * rng.standard_normal(shape).astype(dtype, copy=False)
 
         # Technological choice decision (using current P_{t-1} vs A_{t-1})
-        for i, asp in enumerate(aspirations):
-            if P[i] < asp.value:
-                S_it = np.random.randn()
-                new_T[i] = max(d * T[i], S_it)
-            else:
-                new_T[i] = d * T[i]
+        # firms below aspiration search and keep the better of d*T and S_it
+        with phase("search_decision"):
+            new_T = d * T
+            search = P < aspirations.values
+            n_search = np.count_nonzero(search)
+            S_it = rng.standard_normal(n_search).astype(dtype, copy=False)
+            new_T[search] = np.maximum(new_T[search], S_it)
+        count("searches", n_search)
 
         # Compute new performance P_t
         new_P = new_T + new_M
 
         # Aspiration update — MUST use new_P (P_t)
-        for i, asp in enumerate(aspirations):
-            peer_perf = compute_peer_perf(i, new_P, strategy)   #  use new_P !
-            if aspiration_type == "historical":
-                asp.update(new_P[i])
-            elif aspiration_type == "social":
-                asp.update(peer_perf)
-            elif aspiration_type == "mixed":
-                asp.update(new_P[i], peer_perf)
-            else:
-                asp.update(new_P[i], peer_perf)
+        peer_perf = None
+        if aspirations.uses_peers:
+            with phase("peer_computation"):
+                if network is not None and network.due(t):
+                    network = network.rewired(rng)
+                peer_perf = compute_peer_perfs(new_P, strategy, percentile, network)   #  use new_P !
+        with phase("aspiration_update"):
+            aspirations.update(new_P, peer_perf)
 
+        if recorder is not None:
+            with phase("trajectory_recording"):
+                recorder(t, new_P, aspirations.values, search)
 
         # Update states
         T, M, P = new_T, new_M, new_P
-    
-        performance_records.append(new_P.copy())
 
-    return np.array(performance_records)
+        with phase("moments_update"):
+            moments.update(new_P)
+            if return_trajectory:
+                performance_records[t] = new_P
+
+    return moments, performance_records
+
+def run_single_simulation(aspiration_type, d, v, strategy="stepwise",
+                          n_firms=NUM_ORG, n_periods=NUM_PERIOD,
+                          burn_in=0, return_trajectory=False, rng=None, backend="numpy",
+                          recorder=None, precision="float64", **params):
+    """Simulate one population of firms.
+
+    Returns per-firm mean performance and risk over the periods after burn_in,
+    plus the (n_periods, n_firms) performance matrix if return_trajectory is set.
+    recorder receives the per-period states, precision sets the state dtype
+    and params may override gamma, mu, w and percentile or pass the
+    network of strategy="network" (see _simulate_runs).
+    """
+    moments, perf = _simulate_runs(aspiration_type, d, v, strategy, n_firms, n_periods, 1,
+                                   burn_in=burn_in, return_trajectory=return_trajectory,
+                                   rng=rng, backend=backend, recorder=recorder,
+                                   precision=precision, **params)
+    if return_trajectory:
+        return moments.mean[0], moments.std()[0], perf[:, 0, :]
+    return moments.mean[0], moments.std()[0]
+
+def unit_seed(seed, cell_idx, run_id):
+    """SeedSequence of one (cell, run) work unit.
+
+    Equal to SeedSequence(seed).spawn(...)[cell_idx].spawn(...)[run_id], so
+    each unit's stream depends only on its position in the grid.
+    """
+    return np.random.SeedSequence(seed, spawn_key=(cell_idx, run_id))
+
+def batch_seed(seed, stream, lo):
+    """SeedSequence of the chunk of batched runs starting at run lo of a cell (stream)."""
+    return np.random.SeedSequence(seed, spawn_key=(BATCH_STREAM_KEY, stream, lo))
+
+def run_batched_simulation(aspiration_type, d, v, strategy="stepwise",
+                           n_firms=NUM_ORG, n_periods=NUM_PERIOD, n_runs=NUM_REPEAT,
+                           chunk_size=None, burn_in=0, rng=None, seed=None, stream=0, backend="numpy",
+                           on_chunk=None, recorder=None, precision="float64", **params):
+    """Simulate all replications of one (aspiration, d, v) cell together.
+
+    Runs are advanced in chunks of chunk_size; by default a chunk holds as many
+    runs as BATCH_MAX_ELEMENTS firm states allow. on_chunk(n) is called with
+    the number of runs finished after every chunk. With seed set, the chunk
+    starting at run lo draws from its own Generator (batch_seed(seed, stream, lo)),
+    so results are fixed by seed and chunk_size; otherwise draws come from rng
+    or the global state as in _simulate_runs. recorder, if given, is
+    called with the first run index of every chunk and returns that chunk's
+    per-period recorder (e.g. functools.partial(store.recorder, cell_idx)).
+    params may override gamma, mu, w and percentile or pass the network of
+    strategy="network" (see _simulate_runs).
+    Returns per-run, per-firm mean performance and risk, each (n_runs, n_firms)
+    in the dtype of precision.
+    """
+    if seed is not None and rng is not None:
+        raise ValueError("pass either seed or rng")
+    if chunk_size is None:
+        chunk_size = max(1, BATCH_MAX_ELEMENTS // max(1, n_firms))
+    dtype = state_dtype(precision)
+    mean_perf = np.empty((n_runs, n_firms), dtype=dtype)
+    risk = np.empty((n_runs, n_firms), dtype=dtype)
+    for lo in range(0, n_runs, chunk_size):
+        hi = min(lo + chunk_size, n_runs)
+        moments, _ = _simulate_runs(aspiration_type, d, v, strategy, n_firms, n_periods,
+                                    hi - lo, burn_in=burn_in, backend=backend,
+                                    rng=rng if seed is None else np.random.default_rng(batch_seed(seed, stream, lo)),
+                                    recorder=recorder(lo) if recorder is not None else None,
+                                    precision=precision, **params)
+        mean_perf[lo:hi] = moments.mean
+        risk[lo:hi] = moments.std()
+        if on_chunk is not None:
+            on_chunk(hi - lo)
+    return mean_perf, risk
+
+def crn_seeds(seed, stream, run_id):
+    """Initial-state, market and search SeedSequences of one common-random-numbers run."""
+    return np.random.SeedSequence(seed, spawn_key=(CRN_STREAM_KEY, stream, run_id)).spawn(3)
+
+def run_crn_simulation(d, v, strategy="stepwise", n_firms=NUM_ORG, n_periods=NUM_PERIOD,
+                       n_runs=NUM_REPEAT, aspiration_types=ASPIRATION_TYPE, seed=SEED,
+                       stream=0, burn_in=0, chunk_size=None, block_size=CRN_BLOCK_PERIODS,
+                       on_chunk=None, precision="float64"):
+    """Simulate all aspiration types of one (d, v) level on common random numbers.
+
+    Every run draws its initial T/M/A0, market innovations and candidate S_it
+    values once, in blocks of block_size periods, from its own streams
+    (crn_seeds(seed, stream, run_id)). All aspiration types are advanced in
+    lockstep on those same draws: firm i's candidate technology in period t is
+    identical across types and only used if that type makes it search.
+    Results do not depend on block_size or chunk_size.
+    Returns {aspiration_type: (mean_perf, risk)} with (n_runs, n_firms) arrays.
+    """
+    n_types = len(aspiration_types)
+    if chunk_size is None:
+        chunk_size = max(1, BATCH_MAX_ELEMENTS // max(1, n_firms * n_types))
+    dtype = state_dtype(precision)
+    out = {asp: (np.empty((n_runs, n_firms), dtype=dtype), np.empty((n_runs, n_firms), dtype=dtype))
+           for asp in aspiration_types}
+    for lo in range(0, n_runs, chunk_size):
+        hi = min(lo + chunk_size, n_runs)
+        moments = _simulate_crn(aspiration_types, d, v, strategy, n_firms, n_periods,
+                                [crn_seeds(seed, stream, run_id) for run_id in range(lo, hi)],
+                                burn_in, block_size, dtype)
+        mean, std = moments.mean, moments.std()
+        for a, asp in enumerate(aspiration_types):
+            out[asp][0][lo:hi] = mean[a]
+            out[asp][1][lo:hi] = std[a]
+        if on_chunk is not None:
+            on_chunk(hi - lo)
+    return out
+
+def _simulate_crn(aspiration_types, d, v, strategy, n_firms, n_periods, run_seeds,
+                  burn_in, block_size, dtype=np.float64):
+    if burn_in >= n_periods:
+        raise ValueError("burn_in must be smaller than n_periods")
+    n_runs, n_types = len(run_seeds), len(aspiration_types)
+    init_rngs, market_rngs, search_rngs = zip(*[[np.random.default_rng(s) for s in seeds]
+                                               for seeds in run_seeds])
+
+    def draw(rngs, k):
+        # (k, n_runs, n_firms) block; run r continues its own stream
+        return np.stack([g.standard_normal((k, n_firms)) for g in rngs], axis=1).astype(dtype, copy=False)
+
+    # ---- initialization (shared by all aspiration types) ----
+    T0, M, A0 = draw(init_rngs, 3)
+    T = np.repeat(T0[None], n_types, axis=0)
+    P = T + M
+    aspirations = [AspirationVector(asp, A0, dtype=dtype) for asp in aspiration_types]
+    peer_types = [a for a, asp in enumerate(aspirations) if asp.uses_peers]
+    moments = RunningMoments((n_types, n_runs, n_firms), burn_in=burn_in, dtype=dtype)
+    count("firm_periods", n_periods * n_types * n_runs * n_firms)
+
+    # ---- simulate over time ----
+    for start in range(0, n_periods, block_size):
+        k = min(block_size, n_periods - start)
+        with phase("market_update"):
+            Z = draw(market_rngs, k)
+        with phase("search_decision"):
+            S = draw(search_rngs, k)
+        for t in range(k):
+            # Market update: the same for every aspiration type
+            with phase("market_update"):
+                M = v * M + (1 - v) * Z[t]
+
+            # Technological choice decision on the shared candidates S_it
+            with phase("search_decision"):
+                A = np.stack([asp.values for asp in aspirations])
+                search = P < A
+                new_T = d * T
+                new_T = np.where(search, np.maximum(new_T, S[t]), new_T)
+            count("searches", np.count_nonzero(search))
+
+            new_P = new_T + M
+
+            # Aspiration update with P_t
+            peer_perf = np.empty_like(new_P)
+            if peer_types:
+                with phase("peer_computation"):
+                    peer_perf[peer_types] = compute_peer_perfs(new_P[peer_types], strategy)
+            with phase("aspiration_update"):
+                for a, asp in enumerate(aspirations):
+                    asp.update(new_P[a], peer_perf[a])
+
+            T, P = new_T, new_P
+            with phase("moments_update"):
+                moments.update(new_P)
+    return moments
 
 
 # experiment functions
-def run_experiment(n_firms,n_periods,strategy,n_runs):
-    records = []
+class ResultColumns:
+    """Preallocated typed columns of the per-firm result table.
+
+    Rows are ordered by cell, then Run_ID, then Org_ID. Factor columns are
+    stored as category codes and only wrapped into pandas Categoricals in
+    to_frame(), so no per-row Python objects are created. n_runs is either
+    one count for all cells or a sequence with one count per cell. Performance
+    and Risk are stored as dtype (float64, or float32 to halve the table).
+    """
+    def __init__(self, cells, strategy, n_runs, n_firms, dtype=np.float64):
+        self.cells = cells
+        self.strategy = strategy
+        self.n_runs = np.broadcast_to(np.asarray(n_runs, dtype=np.int64), (len(cells),)).copy()
+        self.n_firms = n_firms
+        self.cell_sizes = self.n_runs * n_firms
+        self.offsets = np.concatenate(([0], np.cumsum(self.cell_sizes)))
+        n_rows = int(self.offsets[-1])
+        self.performance = np.empty(n_rows, dtype=dtype)
+        self.risk = np.empty(n_rows, dtype=dtype)
+
+    def set_cell(self, cell_idx, cell_perf, cell_risk):
+        """Store the (n_runs, n_firms) mean performance and risk of one cell."""
+        rows = slice(self.offsets[cell_idx], self.offsets[cell_idx + 1])
+        self.performance[rows] = np.ravel(cell_perf)
+        self.risk[rows] = np.ravel(cell_risk)
+
+    def _factor(self, values, categories):
+        codes = np.array([categories.index(x) for x in values], dtype=np.int8)
+        return pd.Categorical.from_codes(np.repeat(codes, self.cell_sizes), categories)
+
+    def to_frame(self):
+        n_rows = len(self.performance)
+        max_id = max(int(self.n_runs.max(initial=0)), self.n_firms)
+        id_dtype = np.int16 if max_id <= np.iinfo(np.int16).max else np.int32
+        tech, market, _, _, asp = zip(*self.cells) if self.cells else ((),) * 5
+        run_ids = np.concatenate([np.arange(n, dtype=id_dtype) for n in self.n_runs]) if self.cells else np.empty(0, id_dtype)
+        return pd.DataFrame({
+            "Aspiration": self._factor(asp, sorted(set(ASPIRATION_TYPE))),
+            "Tech_Uncert_Level": self._factor(tech, sorted(set(tech) | {"High", "Low"})),
+            "Market_Uncert_Level": self._factor(market, sorted(set(market) | {"High", "Low"})),
+            "Strategy": pd.Categorical.from_codes(np.zeros(n_rows, dtype=np.int8), [self.strategy]),
+            "Performance": self.performance,
+            "Risk": self.risk,
+            "Run_ID": np.repeat(run_ids, self.n_firms),
+            "Org_ID": np.tile(np.arange(self.n_firms, dtype=id_dtype), n_rows // max(self.n_firms, 1)),
+        })
+
+def check_precision(n_firms, n_periods, strategy, n_runs, precision="float32", seed=SEED,
+                    workers=1, atol=1e-3, rtol=5e-2, **kwargs):
+    """Run the seeded grid in float64 and in precision and compare Table 1 (analysis.compare_precision).
 
+    Both runs draw from the same per-unit streams, so differences come from
+    rounding only (a rounded comparison can flip a search decision and change
+    that run's later draws). Returns the comparison report; raises
+    AssertionError if a group mean or F-value moves beyond atol / rtol.
+    """
+    from src.analysis import compare_precision
+    frames = {p: run_experiment(n_firms, n_periods, strategy, n_runs, workers=workers, seed=seed,
+                                precision=p, **kwargs)
+              for p in ("float64", precision)}
+    for p, df in frames.items():
+        print(f"💾 {p}: {df.memory_usage(deep=True).sum() / 2**20:.1f} MB")
+    # rows line up (same cells, runs and firms), so diverged runs can be counted directly
+    gap = np.abs(frames["float64"]["Performance"].to_numpy() - frames[precision]["Performance"].to_numpy())
+    diverged = np.count_nonzero(gap.reshape(-1, n_firms).max(axis=1) > atol)
+    print(f"🔀 {diverged} of {len(gap) // n_firms} runs diverged by more than {atol}")
+    return compare_precision(frames["float64"], frames[precision], atol=atol, rtol=rtol)
+
+def experiment_cells():
+    """List the (tech_level, market_level, d, v, aspiration) cells of the grid in run order."""
+    cells = []
     for (label, d, v) in UNCERTAINTY_LEVELS:
         tech_level = "Low" if "low_tech" in label else "High"
         market_level = "Low" if "low_market" in label else "High"
-
         for asp in ASPIRATION_TYPE:
+            cells.append((tech_level, market_level, d, v, asp))
+    return cells
+
+def run_experiment(n_firms,n_periods,strategy,n_runs,batched=False,chunk_size=None,burn_in=0,
+                   workers=None,seed=SEED,cache_dir=None,backend="numpy",progress=None,
+                   crn=False,trajectory_dir=None,trajectory_every=1,trajectory_dtype="float32",
+                   precision="float64",network=None,adaptive_tol=None,**adaptive_options):
+    """Run the full aspiration x uncertainty grid.
+
+    With batched=True all runs of a cell are simulated together by
+    run_batched_simulation instead of one run_single_simulation call per run.
+    Every (cell, run) unit draws from its own Generator derived from seed
+    (unit_seed), in-process by default or spread over workers processes, so
+    results do not depend on the worker count. Batched runs draw one stream per
+    chunk of runs (batch_seed), so they are fixed by seed and chunk_size but
+    differ from the unit-by-unit results.
+    With cache_dir set, seeded units are read from / written to a ResultCache
+    there (in-process unless workers is given), so only missing units run.
+    Seeded units run one by one, so batched and chunk_size cannot be combined
+    with workers or cache_dir.
+    The first burn_in periods of every run are left out of Performance and Risk.
+    backend selects the simulation kernel: "numpy" or "numba" (see src.kernels).
+    progress, if given, is called with a progress event dict (completed runs,
+    per-cell and overall ETA; see instrumentation.ProgressTracker) as runs finish.
+    With crn=True the four aspiration types of each (d, v) level run on common
+    random numbers drawn from seed (see run_crn_simulation); this mode runs
+    in-process with the numpy backend.
+    With trajectory_dir set, per-period performance, aspiration and search
+    decisions of every firm are streamed into a TrajectoryStore there (every
+    trajectory_every-th period, as trajectory_dtype); its path is kept in
+    df.attrs["trajectory_dir"]. Not available with crn, cache_dir or adaptive_tol.
+    precision="float32" runs the simulator in float32 and returns float32
+    Performance/Risk columns (numpy backend only); check_precision() measures
+    how far Table 1 moves against a float64 run.
+    strategy="network" takes reference groups from network (a
+    networks.PeerNetwork); it runs in-process (no workers, cache_dir, crn or adaptive_tol).
+    With adaptive_tol set, n_runs is the maximum budget per cell and runs are
+    added in batches until the stopping rule of src.adaptive is met (options
+    such as batch_runs, criterion, scope go in adaptive_options); the per-cell
+    stopping report is attached as records in df.attrs["adaptive_report"]
+    (run_adaptive_experiment also returns it and the per-batch history as
+    tables). Not available with batched, chunk_size, crn or trajectory_dir.
+    """
+    if strategy == "network" and (workers is not None or cache_dir is not None or crn
+                                  or adaptive_tol is not None):
+        raise ValueError("the network strategy runs in-process; drop workers/cache_dir/crn/adaptive_tol")
+    if adaptive_tol is None and adaptive_options:
+        raise TypeError(f"unexpected arguments without adaptive_tol: {sorted(adaptive_options)}")
+    if adaptive_tol is not None and (batched or chunk_size is not None or crn or trajectory_dir is not None):
+        raise ValueError("adaptive_tol runs seeded units in batches; drop batched/chunk_size/crn/trajectory_dir")
+    if adaptive_tol is not None:
+        from src.adaptive import run_adaptive_experiment
+        df, _, _ = run_adaptive_experiment(
+            n_firms, n_periods, strategy, tol=adaptive_tol, max_runs=n_runs,
+            workers=workers or 1, seed=seed, burn_in=burn_in, cache_dir=cache_dir,
+            backend=backend, progress=progress, precision=precision, **adaptive_options)
+        return df
+    if (batched or chunk_size is not None) and not crn and (workers is not None or cache_dir is not None):
+        raise ValueError("batched/chunk_size apply to in-process runs; drop workers/cache_dir")
+    if crn and (workers is not None or cache_dir is not None or backend != "numpy"):
+        raise ValueError("crn mode runs in-process with the numpy backend; drop workers/cache_dir/backend")
+    dtype = state_dtype(precision)
+    cells = experiment_cells()
+    store = None
+    if trajectory_dir is not None:
+        if crn or cache_dir is not None:
+            raise ValueError("trajectory recording cannot be combined with crn or cache_dir")
+        from src.trajectories import TrajectoryStore
+        store = TrajectoryStore.create(trajectory_dir, cells, n_runs, n_firms, n_periods,
+                                       every=trajectory_every, dtype=trajectory_dtype)
+    tracker = ProgressTracker(progress, cells, n_runs) if progress is not None else None
+    if cache_dir is not None and workers is None:
+        workers = 1
+    if workers is not None:
+        from src.parallel import run_cells_parallel
+        from src.cache import ResultCache
+        cache = ResultCache(cache_dir) if cache_dir is not None else None
+        results = run_cells_parallel(cells, n_firms=n_firms, n_periods=n_periods,
+                                     strategy=strategy, n_runs=n_runs, workers=workers,
+                                     seed=seed, burn_in=burn_in, cache=cache,
+                                     backend=backend,
+                                     on_unit=tracker.runs_done if tracker else None,
+                                     trajectory_dir=trajectory_dir, precision=precision)
+
+    columns = ResultColumns(cells, strategy, n_runs, n_firms, dtype=dtype)
+    for cell_idx, (tech_level, market_level, d, v, asp) in enumerate(cells):
+        if tracker and workers is None:
+            tracker.start_cell(cell_idx)
+        if workers is not None:
+            cell_perf, cell_risk = results[cell_idx]
+        elif crn:
+            level_idx = cell_idx // len(ASPIRATION_TYPE)
+            if cell_idx % len(ASPIRATION_TYPE) == 0:
+                level_cells = range(cell_idx, cell_idx + len(ASPIRATION_TYPE))
+                if tracker:
+                    for c in level_cells:
+                        tracker.start_cell(c)
+                crn_results = run_crn_simulation(
+                    d=d, v=v, strategy=strategy, n_firms=n_firms, n_periods=n_periods,
+                    n_runs=n_runs, seed=seed, stream=level_idx, burn_in=burn_in,
+                    chunk_size=chunk_size, precision=precision,
+                    on_chunk=(lambda n: [tracker.runs_done(c, n) for c in level_cells]) if tracker else None,
+                )
+            cell_perf, cell_risk = crn_results[asp]
+        elif batched:
+            cell_perf, cell_risk = run_batched_simulation(
+                aspiration_type=asp, d=d, v=v, strategy=strategy,
+                n_firms=n_firms, n_periods=n_periods, n_runs=n_runs,
+                chunk_size=chunk_size, burn_in=burn_in, backend=backend,
+                seed=seed, stream=cell_idx,
+                on_chunk=(lambda n, c=cell_idx: tracker.runs_done(c, n)) if tracker else None,
+                recorder=(lambda lo, c=cell_idx: store.recorder(c, lo)) if store else None,
+                precision=precision, network=network,
+            )
+        else:
+            cell_perf = np.empty((n_runs, n_firms), dtype=dtype)
+            cell_risk = np.empty((n_runs, n_firms), dtype=dtype)
             for run_id in range(n_runs):
-                perf_matrix = run_single_simulation(
+                cell_perf[run_id], cell_risk[run_id] = run_single_simulation(
                     aspiration_type=asp, d=d, v=v,
                     strategy=strategy, n_firms=n_firms, n_periods=n_periods,
+                    burn_in=burn_in, backend=backend,
+                    rng=np.random.default_rng(unit_seed(seed, cell_idx, run_id)),
+                    recorder=store.recorder(cell_idx, run_id) if store else None,
+                    precision=precision, network=network,
                 )
+                if tracker:
+                    tracker.runs_done(cell_idx)
+        with phase("record_building"):
+            columns.set_cell(cell_idx, cell_perf, cell_risk)
 
-                mean_perf = np.mean(perf_matrix, axis=0)
-                risk = np.std(perf_matrix, axis=0)
-                
-                # 为每个组织创建记录
-                for org_id, (org_perf, org_risk) in enumerate(zip(mean_perf, risk)):
-                    records.append({
-                        "Aspiration": asp,
-                        "Tech_Uncert_Level": tech_level,
-                        "Market_Uncert_Level": market_level,
-                        "Strategy": strategy,
-                        "Performance": org_perf,
-                        "Risk": org_risk,
-                        "Run_ID": run_id,
-                        "Org_ID": org_id
-                    })
-
-    df = pd.DataFrame(records)
+    with phase("record_building"):
+        df = columns.to_frame()
+    if store is not None:
+        df.attrs["trajectory_dir"] = str(store.root)
     print(f"\n📊 Raw data for ANOVA - Shape: {df.shape}")
     print(f"📈 Total observations: {len(df)}")
-    return df
\ No newline at end of file
+    return df
@@ -0,0 +1,139 @@
+# src/sweep.py
+
+### parameter sweeps over behavioural and uncertainty parameters ###
+
+"""
+Usage:
+
+    design = grid_design(gamma=[0.3, 0.5, 0.7], w=[0.25, 0.5, 0.75])
+    design = lhs_design({"gamma": (0.1, 0.9), "mu": (0.0, 0.1)}, n_points=32)
+    design = sobol_design({"d": (0.5, 0.95), "v": (0.5, 0.95)}, n_points=16)
+    df = run_sweep(design, n_firms=200, n_periods=1000, strategy="stepwise", n_runs=100, workers=8)
+
+A design is a table with one row per point and one column per swept
+parameter: gamma, mu, w, percentile (the PERCENTILE_STEPWISE share), d and v.
+Parameters a point leaves out keep their src.config values, and without d / v
+a point runs both configured levels of that factor, so a point that sweeps
+only behavioural parameters runs the full Table 1 grid.
+
+All (point, cell, run) units are scheduled as one batch. Unit streams are
+seeded by the cell's position in the point's grid and the run number, not by
+the point, so every point sees the same initial states and shocks (common
+random numbers across points), and a point at the config values reproduces
+run_experiment(..., seed=seed).
+"""
+
+import itertools
+import numpy as np
+import pandas as pd
+from scipy.stats import qmc
+
+from src.config import SEED, ASPIRATION_TYPE, UNCERTAINTY_LEVELS
+from src.simulation import experiment_cells, ResultColumns, state_dtype
+from src.parallel import BEHAVIOR_DEFAULTS, run_units
+
+SWEEP_PARAMETERS = ("gamma", "mu", "w", "percentile", "d", "v")
+
+
+# ---------- Designs ----------
+def grid_design(**values):
+    """Full factorial design over the given parameter value lists."""
+    _check_names(values)
+    names = list(values)
+    return pd.DataFrame(list(itertools.product(*values.values())), columns=names)
+
+
+def lhs_design(bounds, n_points, seed=SEED):
+    """Latin hypercube of n_points over {parameter: (low, high)} bounds."""
+    return _scaled(qmc.LatinHypercube(d=len(bounds), seed=seed).random(n_points), bounds)
+
+
+def sobol_design(bounds, n_points, seed=SEED):
+    """Scrambled Sobol sequence of n_points (a power of two keeps its balance properties)."""
+    return _scaled(qmc.Sobol(d=len(bounds), seed=seed).random(n_points), bounds)
+
+
+def _scaled(sample, bounds):
+    _check_names(bounds)
+    low, high = zip(*bounds.values())
+    return pd.DataFrame(qmc.scale(sample, low, high), columns=list(bounds))
+
+
+def _check_names(names):
+    unknown = set(names) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}; choose from {SWEEP_PARAMETERS}")
+
+
+# ---------- Execution ----------
+def sweep_cells(point):
+    """(tech_level, market_level, d, v, aspiration) cells of one design point."""
+    if "d" not in point and "v" not in point:
+        return experiment_cells()
+    tech = list(dict.fromkeys(("Low" if "low_tech" in label else "High", d) for label, d, _ in UNCERTAINTY_LEVELS))
+    market = list(dict.fromkeys(("Low" if "low_market" in label else "High", v) for label, _, v in UNCERTAINTY_LEVELS))
+    if "d" in point:
+        tech = [(f"d={point['d']:g}", point["d"])]
+    if "v" in point:
+        market = [(f"v={point['v']:g}", point["v"])]
+    return [(t, m, d, v, asp) for t, d in tech for m, v in market for asp in ASPIRATION_TYPE]
+
+
+def run_sweep(design, n_firms, n_periods, strategy, n_runs, workers=None, seed=SEED, burn_in=0,
+              cache_dir=None, backend="numpy", precision="float64"):
+    """
+    Simulate every point of design (a DataFrame or a list of dicts) and return
+    one long table: the per-firm results of all points with columns Point,
+    gamma, mu, w, percentile, d, v in front of the usual run_experiment columns.
+    """
+    points = [{k: v for k, v in row.items() if not pd.isna(v)}
+              for row in pd.DataFrame(design).to_dict("records")]
+    for point in points:
+        _check_names(point)
+    dtype = state_dtype(precision)
+    cache = None
+    if cache_dir is not None:
+        from src.cache import ResultCache
+        cache = ResultCache(cache_dir)
+
+    grids = [sweep_cells(point) for point in points]
+    owners = {}  # unit -> points it belongs to (duplicate points share units)
+    for p, (point, cells) in enumerate(zip(points, grids)):
+        behavior = tuple((k, float(point[k])) for k in BEHAVIOR_DEFAULTS if k in point) or None
+        for cell_idx, cell in enumerate(cells):
+            for run_id in range(n_runs):
+                unit = (cell_idx, run_id, cell, seed, n_firms, n_periods, strategy, burn_in,
+                        precision, backend, None, behavior)
+                owners.setdefault(unit, []).append(p)
+    columns = [ResultColumns(cells, strategy, n_runs, n_firms, dtype=dtype) for cells in grids]
+    results = [{c: (np.empty((n_runs, n_firms), dtype=dtype), np.empty((n_runs, n_firms), dtype=dtype))
+                for c in range(len(cells))} for cells in grids]
+
+    def store(unit, mean_perf, risk):
+        cell_idx, run_id = unit[:2]
+        for p in owners[unit]:
+            perf, risk_out = results[p][cell_idx]
+            perf[run_id] = mean_perf
+            risk_out[run_id] = risk
+
+    run_units(list(owners), workers=workers, cache=cache, on_result=store)
+
+    frames = []
+    for p, point in enumerate(points):
+        for cell_idx, (perf, risk) in results[p].items():
+            columns[p].set_cell(cell_idx, perf, risk)
+        frame = columns[p].to_frame()
+        values = dict(BEHAVIOR_DEFAULTS, **point)
+        frame.insert(0, "Point", np.int32(p))
+        for i, name in enumerate(SWEEP_PARAMETERS[:4]):
+            frame.insert(1 + i, name, values[name])
+        cell_d = np.repeat([cell[2] for cell in grids[p]], n_runs * n_firms)
+        cell_v = np.repeat([cell[3] for cell in grids[p]], n_runs * n_firms)
+        frame.insert(5, "d", cell_d)
+        frame.insert(6, "v", cell_v)
+        frames.append(frame)
+    df = pd.concat(frames, ignore_index=True)
+    for factor in ["Aspiration", "Tech_Uncert_Level", "Market_Uncert_Level", "Strategy"]:
+        df[factor] = df[factor].astype("category")
+    print(f"\n📊 Sweep results - {len(points)} point(s), shape: {df.shape}")
+    return df
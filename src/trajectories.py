@@ -0,0 +1,159 @@
+# src/trajectories.py
+
+### memory-mapped per-period trajectory store ###
+
+"""
+Usage:
+
+    df = run_experiment(..., trajectory_dir="outputs/trajectories", trajectory_every=10)
+    store = TrajectoryStore.open("outputs/trajectories")
+    means = store.period_means("performance")              # one row per (cell, period)
+    bands = store.period_quantiles("performance", q=(0.1, 0.5, 0.9))
+
+Every field is one .npy file of shape (cell, run, period, firm), written
+through np.memmap while the simulation runs, so the full trajectories never
+have to fit in memory. Only every `every`-th period is kept (periods 0,
+every, 2*every, ...). Fields:
+
+- performance: P_t after the period's market and technology update
+- aspiration:  A_t after the aspiration update with P_t
+- search:      whether the firm searched in period t (P_{t-1} < A_{t-1})
+
+Several processes may record into the same store at once, as long as they
+write disjoint (cell, run) rows.
+"""
+
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from src.config import BATCH_MAX_ELEMENTS, TRAJECTORY_BLOCK_PERIODS
+
+FIELDS = ("performance", "aspiration", "search")
+
+
+class TrajectoryStore:
+    """(cell, run, period, firm) arrays of one experiment, backed by .npy files in root."""
+
+    def __init__(self, root, meta, mode="r"):
+        self.root = Path(root)
+        self.meta = meta
+        self.cells = [tuple(cell) for cell in meta["cells"]]
+        self.every = meta["every"]
+        self.periods = np.arange(0, meta["n_periods"], self.every)
+        self.arrays = {field: np.load(self.root / f"{field}.npy", mmap_mode=mode)
+                       for field in meta["fields"]}
+
+    @classmethod
+    def create(cls, root, cells, n_runs, n_firms, n_periods, every=1, dtype="float32",
+               fields=FIELDS):
+        """Allocate the files for a new store (overwriting an existing one in root)."""
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown trajectory fields: {sorted(unknown)}")
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        meta = {"cells": [list(cell) for cell in cells], "n_runs": int(n_runs),
+                "n_firms": int(n_firms), "n_periods": int(n_periods), "every": int(every),
+                "dtype": np.dtype(dtype).name, "fields": list(fields)}
+        shape = (len(cells), n_runs, len(range(0, n_periods, every)), n_firms)
+        for field in fields:
+            field_dtype = np.bool_ if field == "search" else dtype
+            np.lib.format.open_memmap(root / f"{field}.npy", mode="w+", dtype=field_dtype, shape=shape)
+        (root / "meta.json").write_text(json.dumps(meta, indent=2))
+        return cls(root, meta, mode="r+")
+
+    @classmethod
+    def open(cls, root, mode="r"):
+        """Open an existing store; mode="r+" to record into it (e.g. from a worker process)."""
+        meta = json.loads((Path(root) / "meta.json").read_text())
+        return cls(root, meta, mode=mode)
+
+    def recorder(self, cell_idx, run_lo=0):
+        """Per-period callback for runs run_lo, run_lo+1, ... of one cell (see _simulate_runs)."""
+        return _Recorder(self, cell_idx, run_lo)
+
+    # ---------- Readers ----------
+    def _frame(self, cell_idx, columns):
+        tech, market, _, _, asp = self.cells[cell_idx]
+        return pd.DataFrame({"Aspiration": asp, "Tech_Uncert_Level": tech,
+                             "Market_Uncert_Level": market, "Period": self.periods, **columns})
+
+    def _cell_indices(self, cells):
+        return range(len(self.cells)) if cells is None else cells
+
+    def period_means(self, field="performance", cells=None, chunk_elements=BATCH_MAX_ELEMENTS):
+        """Mean over runs and firms of every stored period, one row per (cell, period).
+
+        Reads chunk_elements values at a time and accumulates in float64. For
+        "search" the mean is the share of firms searching.
+        """
+        arr = self.arrays[field]
+        _, n_runs, n_saved, n_firms = arr.shape
+        step = max(1, chunk_elements // max(1, n_saved * n_firms))
+        frames = []
+        for c in self._cell_indices(cells):
+            total = np.zeros(n_saved)
+            for lo in range(0, n_runs, step):
+                total += np.asarray(arr[c, lo:lo + step], dtype=np.float64).sum(axis=(0, 2))
+            frames.append(self._frame(c, {field: total / (n_runs * n_firms)}))
+        return pd.concat(frames, ignore_index=True)
+
+    def period_quantiles(self, field="performance", q=(0.1, 0.5, 0.9), cells=None,
+                         chunk_elements=BATCH_MAX_ELEMENTS):
+        """Quantiles over runs and firms of every stored period, one column per q.
+
+        Quantiles need all values of a period at once, so chunks are blocks of
+        whole periods holding at most chunk_elements values (at least one period).
+        """
+        arr = self.arrays[field]
+        _, n_runs, n_saved, n_firms = arr.shape
+        step = max(1, chunk_elements // max(1, n_runs * n_firms))
+        q = np.atleast_1d(q)
+        frames = []
+        for c in self._cell_indices(cells):
+            out = np.empty((len(q), n_saved))
+            for lo in range(0, n_saved, step):
+                block = np.asarray(arr[c, :, lo:lo + step], dtype=np.float64)
+                k = block.shape[1]
+                out[:, lo:lo + k] = np.quantile(block.transpose(1, 0, 2).reshape(k, -1), q, axis=1)
+            frames.append(self._frame(c, {f"q{x:g}": row for x, row in zip(q, out)}))
+        return pd.concat(frames, ignore_index=True)
+
+
+class _Recorder:
+    """Buffers TRAJECTORY_BLOCK_PERIODS stored periods in memory and writes them as one slab."""
+
+    def __init__(self, store, cell_idx, run_lo):
+        self.store = store
+        self.cell_idx = cell_idx
+        self.run_lo = run_lo
+        self.n_saved = len(store.periods)
+        self.buffers = None
+        self.block_start = 0
+
+    def __call__(self, t, performance, aspiration, search):
+        if t % self.store.every:
+            return
+        slot = t // self.store.every
+        values = {"performance": performance, "aspiration": aspiration, "search": search}
+        if self.buffers is None:
+            n_runs, n_firms = np.shape(performance)
+            self.buffers = {field: np.empty((n_runs, TRAJECTORY_BLOCK_PERIODS, n_firms), dtype=arr.dtype)
+                            for field, arr in self.store.arrays.items()}
+        for field, buf in self.buffers.items():
+            buf[:, slot - self.block_start] = values[field]
+        if slot - self.block_start + 1 == TRAJECTORY_BLOCK_PERIODS or slot == self.n_saved - 1:
+            self._flush(slot + 1)
+
+    def _flush(self, block_end):
+        k = block_end - self.block_start
+        for field, buf in self.buffers.items():
+            arr = self.store.arrays[field]
+            arr[self.cell_idx, self.run_lo:self.run_lo + len(buf), self.block_start:block_end] = buf[:, :k]
+            if block_end == self.n_saved:
+                arr.flush()
+        self.block_start = block_end
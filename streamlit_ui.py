@@ -2,9 +2,14 @@
 import streamlit as st
 import pandas as pd
 import pathlib
-from src.simulation import run_experiment
+import threading
+import time
+import uuid
+from src.live import LiveExperiment
 from src.analysis import create_table_detailed
+from src.inference import bootstrap_tables
 from src.plotting import plot_results, out_dir
+from src.cache import cache_dir
 
 
 # --- Streamlit page config ---
@@ -34,37 +39,143 @@ strategy_map = {
 strategy_choice = strategy_map[strategy_label]
 
 st.sidebar.markdown("---")
-st.sidebar.info("Adjust parameters, then click **Run Simulation** below to begin.")
+st.sidebar.info("Adjust parameters, then click **Run Simulation** below to begin. "
+                "Table 1 fills in while the simulation runs; parameter sets you already ran are shown instantly.")
+
+# --- Background experiments, shared by all sessions ---
+MAX_EXPERIMENTS = 8  # finished, unwatched experiments beyond this are forgotten (oldest first)
+
+
+@st.cache_resource(show_spinner=False)
+def experiment_registry():
+    """Background experiments by parameter set and the sessions watching each, shared by all sessions."""
+    return {"lock": threading.Lock(), "experiments": {}, "viewers": {}}
+
+
+def watch_experiment(params, session=None):
+    """The experiment of params, started if missing or cancelled unfinished; session becomes a viewer."""
+    registry = experiment_registry()
+    with registry["lock"]:
+        experiments, viewers = registry["experiments"], registry["viewers"]
+        experiment = experiments.get(params)
+        if experiment is None or (experiment.done and not experiment.complete and experiment.error is None):
+            n_firms, n_periods, n_runs, strategy = params
+            experiment = LiveExperiment(n_firms, n_periods, strategy, n_runs, batch_runs=max(1, n_runs // 20),
+                                        cache_dir=cache_dir).start()  # finished batches load from the cache
+            experiments.pop(params, None)
+            experiments[params] = experiment
+            idle = [p for p, e in experiments.items() if e.done and not viewers.get(p) and p != params]
+            for p in idle[:max(0, len(experiments) - MAX_EXPERIMENTS)]:
+                del experiments[p]
+        if session is not None:
+            viewers.setdefault(params, set()).add(session)
+    return experiment
+
+
+def leave_experiment(params, session):
+    """Stop watching params; the experiment is cancelled once no session watches it.
+
+    Returns whether the experiment had finished all its runs.
+    """
+    registry = experiment_registry()
+    with registry["lock"]:
+        viewers = registry["viewers"].get(params, set())
+        viewers.discard(session)
+        experiment = registry["experiments"].get(params)
+        if experiment is not None and not viewers:
+            experiment.cancel()  # stops after the batch in progress; a finished one is unaffected
+        return experiment is not None and experiment.complete
+
+
+def forget_experiment(params):
+    """Drop a failed experiment so that the next run starts afresh."""
+    registry = experiment_registry()
+    with registry["lock"]:
+        registry["experiments"].pop(params, None)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def final_results(n_firms, n_periods, n_runs, strategy):
+    """Per-firm results and Table 1 of a finished experiment."""
+    experiment = watch_experiment((n_firms, n_periods, n_runs, strategy))
+    experiment.wait()
+    df = experiment.result()
+    return df, create_table_detailed(df)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def inference_results(n_firms, n_periods, n_runs, strategy):
+    """Run-level bootstrap CIs and pairwise contrasts of a finished experiment."""
+    df, _ = final_results(n_firms, n_periods, n_runs, strategy)
+    return bootstrap_tables(df)
+
+
+def show_tables(anova_df, aspiration_df, tech_uncert_df, market_uncert_df):
+    st.subheader("📈 Anova Analytsis")
+    st.dataframe(anova_df, hide_index=True, use_container_width=True)
+    st.subheader("📈 Performance and Risk ~ 4 types of aspirations")
+    st.dataframe(aspiration_df, hide_index=True, use_container_width=True)
+    st.subheader("📈 Performance and Risk ~ Tech Uncertainty Level")
+    st.dataframe(tech_uncert_df, hide_index=True, use_container_width=True)
+    st.subheader("📈 Performance and Risk ~ Market Uncertainty Level")
+    st.dataframe(market_uncert_df, hide_index=True, use_container_width=True)
+
 
 # --- Run Simulation Button ---
+params = (num_org, num_period, num_repeat, strategy_choice)
+started = st.session_state.setdefault("started", set())
+session = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
+# moving a slider leaves the old parameter set; its experiment stops if no other session watches it
+current = st.session_state.get("current")
+if current is not None and current != params:
+    if not leave_experiment(current, session):
+        started.discard(current)
+    del st.session_state["current"]
+
 if st.button("🚀 Run Simulation"):
-    with st.spinner(f"Running simulation with strategy = '{strategy_choice}' ... please wait ⏳"):
- 
-        # === 3️⃣ Perform Table 1-like ANOVA ===
-        df_raw =run_experiment(
-            n_firms=num_org,
-            n_periods=num_period,
-            n_runs=num_repeat,
-            strategy=strategy_choice,
-        )
-        table_anova = create_table_detailed(df_raw)
+    started.add(params)
+
+# parameter sets run before are shown again without waiting
+if params in started:
+    experiment = watch_experiment(params, session)
+    st.session_state["current"] = params
+
+    # === 3️⃣ Table 1-like ANOVA, redrawn as replications complete ===
+    live = st.empty()
+    while not experiment.done:
+        snap = experiment.snapshot()
+        eta = f"{snap['eta']:.0f}s" if snap["runs_done"] else "..."
+        with live.container():
+            st.progress(snap["fraction"], text=(
+                f"Running strategy = '{strategy_choice}': run {snap['runs_done']}/{snap['n_runs']} "
+                f"of every cell, ETA {eta}"))
+            if snap["aggregates"] is not None:
+                show_tables(*create_table_detailed(snap["aggregates"], verbose=False))
+        time.sleep(1.0)
+    live.empty()
+
+    if experiment.error is not None:
+        forget_experiment(params)
+        st.error(f"Simulation failed: {experiment.error}")
+        st.stop()
+    df_raw, table_anova = final_results(*params)
 
     st.success(f"✅ Simulation complete! Strategy used: **{strategy_choice}**")
 
     # --- Results display ---
-    import pandas as pd
-    
     if table_anova is not None:
         # unpack the tuple
         anova_df, aspiration_df, tech_uncert_df, market_uncert_df = table_anova
-        st.subheader("📈 Anova Analytsis")
-        st.dataframe(anova_df, hide_index=True, use_container_width=True)
-        st.subheader("📈 Performance and Risk ~ 4 types of aspirations")
-        st.dataframe(aspiration_df, hide_index=True, use_container_width=True)
-        st.subheader("📈 Performance and Risk ~ Tech Uncertainty Level")
-        st.dataframe(tech_uncert_df, hide_index=True, use_container_width=True)
-        st.subheader("📈 Performance and Risk ~ Market Uncertainty Level")
-        st.dataframe(market_uncert_df, hide_index=True, use_container_width=True)
+        show_tables(anova_df, aspiration_df, tech_uncert_df, market_uncert_df)
+        asp_ci, tech_ci, market_ci, contrasts = inference_results(*params)
+        st.subheader("📏 95% bootstrap intervals (runs resampled within cells)")
+        st.dataframe(pd.concat([asp_ci.rename(columns={"Aspiration": "Level"}), tech_ci, market_ci],
+                               keys=["Aspiration", "Tech Uncertainty", "Market Uncertainty"],
+                               names=["Factor", None]).reset_index(level=0),
+                     hide_index=True, use_container_width=True)
+        st.subheader("🔀 Pairwise contrasts (Tukey-style simultaneous 95% intervals)")
+        st.dataframe(contrasts, hide_index=True, use_container_width=True)
             # --- Plot outputs ---
         plot_results(
         df_raw,
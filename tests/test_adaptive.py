@@ -0,0 +1,30 @@
+# tests/test_adaptive.py
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+from src.adaptive import run_adaptive_experiment, _term_precision
+from src.analysis import METRICS
+from src.simulation import experiment_cells
+
+
+def test_effect_halfwidths_are_projections_of_the_cell_means():
+    cells = experiment_cells()
+    ones = np.ones(len(cells))
+    terms = _term_precision(cells, {m: (None, ones, ones, None) for m in METRICS}, z=1.0)
+    # unit variance per cell: the variance of an effect is the diagonal of its projection,
+    # i.e. prod (1 - 1/k) over the term's factors times prod 1/k over the others
+    expected = {"C(Aspiration)": 3 / 4 / 4, "C(Tech_Uncert_Level)": 1 / 2 / 8,
+                "C(Aspiration):C(Tech_Uncert_Level):C(Market_Uncert_Level)": 3 / 4 / 4}
+    for term, variance in expected.items():
+        row = terms[terms.Term == term].iloc[0]
+        assert row.Performance == pytest.approx(np.sqrt(variance))
+
+
+def test_f_criterion_converges_before_the_budget():
+    _, report, history = run_adaptive_experiment(20, 40, "stepwise", tol=0.015, max_runs=200, batch_runs=10,
+                                                 criterion="f")
+    assert (report.Stop_reason == "converged").all()
+    assert report.Runs.max() < 200
+    widths = history["max_effect_halfwidth"].to_numpy()
+    assert widths[-1] <= 0.015 and np.all(np.diff(widths) < 0)
@@ -0,0 +1,33 @@
+# tests/test_analysis.py
+import numpy as np
+import pytest
+
+from src.analysis import cell_aggregates, anova_from_aggregates, compare_backends
+from src.simulation import experiment_cells, ResultColumns
+
+pytest.importorskip("statsmodels")
+
+
+def frame(n_runs=4, n_firms=6, seed=0):
+    """Synthetic result table with real aspiration and uncertainty effects."""
+    rng = np.random.default_rng(seed)
+    cells = experiment_cells()
+    columns = ResultColumns(cells, "stepwise", n_runs, n_firms)
+    for c, (tech, market, _, _, asp) in enumerate(cells):
+        shift = 0.3 * (c % 4) + 0.5 * (tech == "High") - 0.2 * (market == "High")
+        columns.set_cell(c, rng.standard_normal((n_runs, n_firms)) + shift, rng.random((n_runs, n_firms)))
+    return columns.to_frame()
+
+
+@pytest.mark.parametrize("layout", ["balanced", "unbalanced", "unused-level"])
+def test_aggregate_anova_matches_statsmodels(layout):
+    df = frame()
+    if layout == "unbalanced":
+        df = df.sample(frac=0.7, random_state=1)
+    elif layout == "unused-level":
+        df = df[df.Aspiration != "mixed"]  # the category stays on the column
+    worst = compare_backends(df)
+    assert max(worst.values()) <= 1e-8
+    if layout == "unused-level":
+        anova = anova_from_aggregates(cell_aggregates(df), "Performance")
+        assert anova.loc["C(Aspiration)", "df"] == 2
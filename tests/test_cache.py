@@ -0,0 +1,52 @@
+# tests/test_cache.py
+import numpy as np
+import pytest
+
+from src import cache as cache_module, parallel
+from src.cache import ResultCache
+from src.simulation import experiment_cells
+
+GRID = dict(n_firms=8, n_periods=10, strategy="stepwise", n_runs=3, seed=2)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_interrupted_grid_resumes_from_the_cache(tmp_path, monkeypatch):
+    cells = experiment_cells()[:2]
+    cache = ResultCache(tmp_path)
+    finished = []
+
+    def stop_after_four(cell_idx):
+        finished.append(cell_idx)
+        if len(finished) == 4:
+            raise Interrupted
+
+    with pytest.raises(Interrupted):
+        parallel.run_cells_parallel(cells, workers=1, cache=cache, on_unit=stop_after_four, **GRID)
+    assert len(list(tmp_path.rglob("*.npz"))) == 4  # units are stored as they finish
+
+    simulated = []
+    run_unit = parallel._run_unit
+    monkeypatch.setattr(parallel, "_run_unit", lambda unit: simulated.append(unit[:2]) or run_unit(unit))
+    resumed = parallel.run_cells_parallel(cells, workers=1, cache=cache, **GRID)
+    assert len(simulated) == 2 and len(list(tmp_path.rglob("*.npz"))) == 6
+
+    fresh = parallel.run_cells_parallel(cells, workers=1, **GRID)
+    for c in fresh:
+        for got, expected in zip(resumed[c], fresh[c]):
+            np.testing.assert_array_equal(got, expected)
+
+
+def test_key_covers_parameters_and_version(monkeypatch):
+    unit = (0, 1, experiment_cells()[0], 2, 8, 10, "stepwise", 0, "float64", "numpy", None, None)
+    key = ResultCache.key(parallel.unit_params(unit))
+    assert ResultCache.key(parallel.unit_params(unit[:9] + ("numba",) + unit[10:])) == key
+    for changed in [unit[:1] + (2,) + unit[2:],              # run id
+                    unit[:7] + (5,) + unit[8:],              # burn_in
+                    unit[:8] + ("float32",) + unit[9:],      # precision
+                    unit[:11] + ((("gamma", 0.7),),)]:       # behaviour
+        assert ResultCache.key(parallel.unit_params(changed)) != key
+    monkeypatch.setattr(cache_module, "CACHE_VERSION", cache_module.CACHE_VERSION + 1)
+    assert ResultCache.key(parallel.unit_params(unit)) != key
@@ -0,0 +1,25 @@
+# tests/test_cli.py
+import importlib.util
+
+import pandas as pd
+import pytest
+
+from src import cli
+
+SMALL = ["simulate", "--firms", "8", "--periods", "10", "--runs", "2", "--seed", "3"]
+
+
+@pytest.mark.parametrize("mode", [[], ["--batched"], ["--workers", "2"]])
+def test_seed_fixes_the_simulated_table(tmp_path, mode):
+    for name in ("a", "b"):
+        assert cli.main(SMALL + mode + ["-o", str(tmp_path / f"{name}.pkl")]) == 0
+    pd.testing.assert_frame_equal(pd.read_pickle(tmp_path / "a.pkl"), pd.read_pickle(tmp_path / "b.pkl"))
+
+
+def test_parquet_without_an_engine_fails_before_simulating(tmp_path, monkeypatch):
+    real_find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec",
+                        lambda name, *a: None if name in cli.PARQUET_ENGINES else real_find_spec(name, *a))
+    with pytest.raises(SystemExit):
+        cli.main(SMALL + ["-o", str(tmp_path / "r.parquet")])
+    assert not (tmp_path / "r.parquet").exists()
@@ -0,0 +1,34 @@
+# tests/test_crn.py
+import numpy as np
+import pytest
+
+from src.config import ASPIRATION_TYPE
+from src.simulation import run_crn_simulation
+
+LEVEL = dict(d=0.9, v=0.5, strategy="stepwise", n_firms=10, n_periods=20, seed=4, stream=1)
+
+
+def assert_same(a, b):
+    for asp in a:
+        for x, y in zip(a[asp], b[asp]):
+            np.testing.assert_array_equal(x, y)
+
+
+def test_every_aspiration_type_reuses_the_same_streams():
+    together = run_crn_simulation(n_runs=3, **LEVEL)
+    for asp in ASPIRATION_TYPE:
+        alone = run_crn_simulation(n_runs=3, aspiration_types=(asp,), **LEVEL)
+        assert_same(alone, {asp: together[asp]})
+    # the types differ only through their aspiration rule, not through their draws
+    assert not np.array_equal(together["historical"][0], together["social"][0])
+
+
+@pytest.mark.parametrize("layout", [dict(chunk_size=1), dict(block_size=3), dict(chunk_size=2, block_size=7)])
+def test_runs_keep_their_streams_across_chunks_and_blocks(layout):
+    assert_same(run_crn_simulation(n_runs=3, **LEVEL, **layout), run_crn_simulation(n_runs=3, **LEVEL))
+
+
+def test_levels_draw_from_separate_streams():
+    other = dict(LEVEL, stream=2)
+    assert not np.array_equal(run_crn_simulation(n_runs=2, **LEVEL)["social"][0],
+                              run_crn_simulation(n_runs=2, **other)["social"][0])
@@ -0,0 +1,51 @@
+# tests/test_inference.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analysis import create_table_detailed
+from src.inference import bootstrap_cell_totals, bootstrap_tables, run_summaries
+from src.simulation import run_experiment
+
+pytest.importorskip("scipy")
+
+
+@pytest.fixture(scope="module")
+def df():
+    return run_experiment(n_firms=6, n_periods=15, strategy="stepwise", n_runs=8, seed=2)
+
+
+def test_runs_are_the_resampled_clusters(df):
+    runs = run_summaries(df)
+    assert len(runs) == 16 * 8 and (runs["n"] == 6).all()
+    by_run = df.groupby(["Aspiration", "Tech_Uncert_Level", "Market_Uncert_Level", "Run_ID"],
+                        observed=True).Performance.sum().to_numpy()
+    np.testing.assert_allclose(runs["Performance_sum"], by_run)
+
+
+def test_paired_replicates_draw_the_same_runs_in_every_cell(df):
+    runs = run_summaries(df)
+    one_cell = runs[runs.Aspiration == runs.Aspiration.iloc[0]].head(8)
+    copies = pd.concat([one_cell.assign(Aspiration=a) for a in ["historical", "mixed"]], ignore_index=True)
+    _, paired, _ = bootstrap_cell_totals(copies, n_boot=50, paired=True)
+    _, unpaired, _ = bootstrap_cell_totals(copies, n_boot=50)
+    np.testing.assert_array_equal(paired[:, 0], paired[:, 1])
+    assert not np.array_equal(unpaired[:, 0], unpaired[:, 1])
+
+
+def test_intervals_and_contrasts(df):
+    asp_ci, tech_ci, market_ci, contrasts = bootstrap_tables(df, n_boot=400, seed=1)
+    _, asp_summary, _, _ = create_table_detailed(df, verbose=False)
+    np.testing.assert_allclose(asp_ci["Perf_diff"], asp_summary["Perf_diff"], atol=1e-3)
+    for table in (asp_ci, tech_ci, market_ci):
+        assert (table["Perf_lo"] <= table["Perf_diff"]).all() and (table["Perf_diff"] <= table["Perf_hi"]).all()
+
+    means = df.groupby("Aspiration", observed=True).Performance.mean()
+    perf = contrasts[(contrasts.Factor == "Aspiration") & (contrasts.Metric == "Performance")]
+    assert len(perf) == 6  # every pair of the four aspiration types
+    np.testing.assert_allclose(perf["Diff"], means[perf.Level_A].to_numpy() - means[perf.Level_B].to_numpy(),
+                               atol=1e-3)
+    assert ((perf["Lo"] <= perf["Diff"]) & (perf["Diff"] <= perf["Hi"]) & perf["p_adj"].between(0, 1)).all()
+
+    again = bootstrap_tables(df, n_boot=400, seed=1, workers=2)
+    pd.testing.assert_frame_equal(again[3], contrasts)
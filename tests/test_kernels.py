@@ -0,0 +1,22 @@
+# tests/test_kernels.py
+import numpy as np
+import pytest
+
+pytest.importorskip("numba")
+
+from src.config import ASPIRATION_TYPE
+from src.kernels import STRATEGY_CODES
+from src.simulation import _simulate_runs
+
+
+@pytest.mark.parametrize("strategy", list(STRATEGY_CODES))
+@pytest.mark.parametrize("aspiration_type", ASPIRATION_TYPE)
+def test_numba_matches_numpy(aspiration_type, strategy):
+    outputs = {}
+    for backend in ["numpy", "numba"]:
+        moments, records = _simulate_runs(aspiration_type, 0.9, 0.5, strategy, n_firms=40, n_periods=40,
+                                          n_runs=2, burn_in=5, return_trajectory=True,
+                                          rng=np.random.default_rng(0), backend=backend)
+        outputs[backend] = (moments.mean, moments.std(), records)
+    for fast, ref in zip(outputs["numba"], outputs["numpy"]):
+        np.testing.assert_allclose(fast, ref, rtol=1e-10, atol=1e-12)
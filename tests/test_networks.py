@@ -0,0 +1,19 @@
+# tests/test_networks.py
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+from src.networks import PeerNetwork, small_world
+
+
+def test_rewired_keeps_rows_and_avoids_self_loops():
+    net = PeerNetwork(small_world(30, 3, 0.1, seed=0, weighted=True), rewire_every=5, rewire_prob=0.5)
+    new = net.rewired(np.random.default_rng(1))
+    assert new.adjacency.diagonal().sum() == 0
+    np.testing.assert_allclose(new.adjacency.sum(axis=1), net.adjacency.sum(axis=1))
+    np.testing.assert_allclose(new.weights.sum(axis=1)[new.adjacency.getnnz(axis=1) > 0], 1.0)
+
+
+def test_rewired_single_firm_is_unchanged():
+    net = PeerNetwork(np.ones((1, 1)), rewire_every=1, rewire_prob=1.0)
+    assert net.rewired(np.random.default_rng(0)) is net
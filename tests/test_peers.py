@@ -0,0 +1,69 @@
+# tests/test_peers.py
+import warnings
+import numpy as np
+import pytest
+
+from src.simulation import compute_peer_perf, compute_peer_perfs
+
+STRATEGIES = ["stepwise", "ambitious", "conservative"]
+
+
+def per_firm(P, strategy, percentile=0.1):
+    """Reference result: compute_peer_perf called for every firm."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # mean of no peers (n=1)
+        return np.array([compute_peer_perf(i, P, strategy, percentile) for i in range(len(P))])
+
+
+def inputs():
+    rng = np.random.default_rng(0)
+    for n in [2, 3, 7, 10, 50, 200, 1000]:
+        yield f"continuous-{n}", rng.standard_normal(n)
+        yield f"integer-ties-{n}", rng.integers(-3, 4, n).astype(float)
+        yield f"rounded-{n}", np.round(rng.standard_normal(n), 1)
+    yield "all-equal", np.full(20, 0.5)
+    yield "symmetric", np.array([-2.0, -1.0, 0.0, 1.0, 2.0, 0.0, -1.0, 1.0])
+
+
+CASES = list(inputs())
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+@pytest.mark.parametrize("name, P", CASES, ids=[name for name, _ in CASES])
+def test_matches_per_firm_loop(name, P, strategy):
+    np.testing.assert_allclose(compute_peer_perfs(P, strategy), per_firm(P, strategy),
+                               rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+@pytest.mark.parametrize("percentile", [0.05, 0.3, 0.9])
+def test_percentile(strategy, percentile):
+    P = np.round(np.random.default_rng(1).standard_normal(60), 1)
+    np.testing.assert_allclose(compute_peer_perfs(P, strategy, percentile),
+                               per_firm(P, strategy, percentile), rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_rows_are_independent_populations(strategy):
+    P = np.random.default_rng(2).integers(0, 5, (4, 30)).astype(float)
+    expected = np.stack([per_firm(row, strategy) for row in P])
+    np.testing.assert_allclose(compute_peer_perfs(P, strategy), expected, rtol=1e-12, atol=1e-12)
+
+
+def test_two_firms_are_each_others_peer():
+    np.testing.assert_array_equal(compute_peer_perfs(np.array([1.0, 3.0]), "stepwise"), [3.0, 1.0])
+
+
+def test_single_firm_has_no_stepwise_peers():
+    # a lone firm has no peer to compare with: stepwise is undefined (NaN), as in compute_peer_perf
+    P = np.array([0.7])
+    assert np.isnan(compute_peer_perfs(P, "stepwise")).all()
+    assert np.isnan(per_firm(P, "stepwise")).all()
+    np.testing.assert_array_equal(compute_peer_perfs(P, "conservative"), P)
+    np.testing.assert_array_equal(compute_peer_perfs(P, "ambitious"), P)
+
+
+def test_equidistant_peers_go_to_lower_index():
+    # firm 1 (value 0) is equally far from firms 0 and 2; with one peer the lower index wins
+    P = np.array([-1.0, 0.0, 1.0] + [10.0] * 7)
+    assert compute_peer_perfs(P, "stepwise")[1] == -1.0
@@ -0,0 +1,42 @@
+# tests/test_plotting.py
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+import matplotlib
+matplotlib.use("Agg")
+
+from src import plotting
+from src.simulation import experiment_cells, ResultColumns
+
+
+def results(n_runs=6, n_firms=5, seed=0):
+    rng = np.random.default_rng(seed)
+    cells = experiment_cells()
+    columns = ResultColumns(cells, "stepwise", n_runs, n_firms)
+    for c in range(len(cells)):
+        columns.set_cell(c, rng.standard_normal((n_runs, n_firms)) + c, rng.random((n_runs, n_firms)))
+    return columns.to_frame()
+
+
+def test_trend_interval_is_over_run_means():
+    df = results()
+    trend = plotting.dynamic_trend_summary(df)
+    row = trend[(trend.Aspiration == "social") & (trend.Run_ID == 3)].iloc[0]
+    run_means = df[df.Aspiration == "social"].groupby("Run_ID").Performance.mean().to_numpy()[:4]
+    half = 1.959964 * run_means.std(ddof=1) / 2
+    assert row.Performance == pytest.approx(run_means.mean())
+    assert row.Performance_ci_high - row.Performance == pytest.approx(half, rel=1e-5)
+    first = trend[trend.Run_ID == 0]
+    assert first.Performance_ci_low.isna().all()  # one run gives no interval
+
+
+def test_parallel_render_writes_to_given_directory(tmp_path):
+    df = results()
+    summaries = {"dynamic_trends": plotting.dynamic_trend_summary(df)}
+    summaries["aspiration_effects_diff"] = df.groupby("Aspiration", observed=True).Performance.mean() \
+        .rename("Perf_diff").to_frame().assign(Risk_diff=0.0).reset_index()
+    rendered = plotting.render_figures(summaries, workers=2, directory=tmp_path)
+    assert sorted(rendered) == sorted(summaries)
+    assert all((tmp_path / f"{name}.png").exists() for name in summaries)
+    assert plotting.render_figures(summaries, directory=tmp_path) == []  # unchanged inputs are skipped
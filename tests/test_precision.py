@@ -0,0 +1,30 @@
+# tests/test_precision.py
+import numpy as np
+import pytest
+
+from src.analysis import compare_precision
+from src.simulation import check_precision, compute_peer_perfs, run_experiment
+
+SMALL = dict(n_firms=10, n_periods=20, strategy="stepwise", n_runs=3)
+
+
+@pytest.mark.parametrize("strategy", ["stepwise", "ambitious", "conservative"])
+def test_peer_perfs_keep_float32(strategy):
+    P = np.random.default_rng(0).standard_normal((3, 20)).astype(np.float32)
+    out = compute_peer_perfs(P, strategy)
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out, compute_peer_perfs(P.astype(np.float64), strategy), rtol=1e-5, atol=1e-6)
+
+
+def test_float32_run_passes_the_guard():
+    report = check_precision(**SMALL, seed=1)
+    assert report["ok"].all()
+
+
+def test_guard_rejects_a_shifted_table():
+    reference = run_experiment(**SMALL, seed=1)
+    compact = reference.astype({"Performance": np.float32, "Risk": np.float32})
+    compare_precision(reference, compact)
+    compact.loc[compact.Aspiration == "social", "Performance"] += np.float32(0.01)
+    with pytest.raises(AssertionError, match="precision check failed"):
+        compare_precision(reference, compact)
@@ -0,0 +1,55 @@
+# tests/test_shards.py
+import json
+import os
+import time
+import pytest
+
+from src import shards
+
+
+def _lock(tmp_path, age=0.0):
+    lock = tmp_path / "shard.lock"
+    lock.write_text("{}")
+    past = time.time() - age
+    os.utime(lock, (past, past))
+    return lock
+
+
+def test_fresh_lock_is_not_reclaimed(tmp_path):
+    lock = _lock(tmp_path)
+    assert not shards._claim(lock, "w1", stale_after=60)
+
+
+def test_stale_lock_is_reclaimed_once(tmp_path):
+    lock = _lock(tmp_path, age=120)
+    assert shards._claim(lock, "w1", stale_after=60)
+    assert not shards._claim(lock, "w2", stale_after=60)  # w1's new lock is fresh
+    assert json.loads(lock.read_text())["worker"] == "w1"
+    assert [p.name for p in tmp_path.iterdir()] == ["shard.lock"]
+
+
+def test_heartbeat_keeps_lock_fresh(tmp_path):
+    lock = _lock(tmp_path, age=120)
+    with shards._Heartbeat(lock, interval=0.05):
+        time.sleep(0.3)
+    assert time.time() - lock.stat().st_mtime < 1
+    assert not shards._claim(lock, "w2", stale_after=60)
+
+
+def test_manifest_version_is_checked(tmp_path):
+    shards.create_manifest(tmp_path, 10, 20, "stepwise", 4, runs_per_shard=2)
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    manifest["version"] = shards.MANIFEST_VERSION + 1
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    with pytest.raises(ValueError, match="manifest version"):
+        shards.load_manifest(tmp_path)
+
+
+def test_stale_after_must_exceed_heartbeat(tmp_path):
+    shards.create_manifest(tmp_path, 10, 20, "stepwise", 4, runs_per_shard=2)
+    with pytest.raises(ValueError):
+        shards.work(tmp_path, stale_after=10, heartbeat=30)
+
+
+def test_merged_shards_equal_single_node_run():
+    assert shards.check_shards(n_firms=10, n_periods=20, n_runs=4, n_procs=2, runs_per_shard=2)
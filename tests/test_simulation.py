@@ -0,0 +1,20 @@
+# tests/test_simulation.py
+import pandas as pd
+import pytest
+
+from src.simulation import run_experiment
+
+SMALL = dict(n_firms=12, n_periods=15, strategy="stepwise", n_runs=3)
+
+
+def test_results_do_not_depend_on_the_worker_count():
+    frames = [run_experiment(**SMALL, workers=workers, seed=5) for workers in (None, 1, 2)]
+    for df in frames[1:]:
+        pd.testing.assert_frame_equal(df, frames[0], check_exact=True)
+
+
+@pytest.mark.parametrize("options", [{}, {"batched": True, "chunk_size": 2}])
+def test_seed_fixes_in_process_results(options):
+    first, second, other = (run_experiment(**SMALL, seed=seed, **options) for seed in (3, 3, 4))
+    pd.testing.assert_frame_equal(first, second, check_exact=True)
+    assert not first["Performance"].equals(other["Performance"])
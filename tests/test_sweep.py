@@ -0,0 +1,33 @@
+# tests/test_sweep.py
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("scipy")
+from src.config import GAMMA
+from src.simulation import experiment_cells, run_experiment, run_single_simulation, unit_seed
+from src.sweep import run_sweep
+
+SMALL = dict(n_firms=8, n_periods=12, strategy="stepwise", n_runs=2, seed=6)
+
+
+def test_sweep_points_reproduce_their_runs():
+    design = [{"gamma": GAMMA}, {"gamma": 0.8}, {"gamma": 0.8, "d": 0.7, "v": 0.6}]
+    df = run_sweep(design, workers=1, **SMALL)
+
+    # a point at the config values is the fixed-budget experiment
+    reference = run_experiment(**SMALL)
+    point = df[df.Point == 0].drop(columns=["Point", "gamma", "mu", "w", "percentile", "d", "v"])
+    pd.testing.assert_frame_equal(point.reset_index(drop=True), reference, check_categorical=False)
+
+    # a changed parameter reaches the unit it was swept for, on the same stream
+    _, _, d5, v5, _ = experiment_cells()[5]
+    for p, cell_idx, d, v in [(1, 5, d5, v5), (2, 3, 0.7, 0.6)]:
+        rows = df[df.Point == p].iloc[(2 * cell_idx + 1) * 8:(2 * cell_idx + 2) * 8]  # run 1 of the cell
+        asp = rows.Aspiration.iloc[0]
+        mean, risk = run_single_simulation(asp, d, v, n_firms=8, n_periods=12, gamma=0.8,
+                                           rng=np.random.default_rng(unit_seed(6, cell_idx, 1)))
+        assert (rows.d == d).all() and (rows.v == v).all()
+        np.testing.assert_array_equal(rows.Performance, mean)
+        np.testing.assert_array_equal(rows.Risk, risk)
+    assert len(df[df.Point == 2]) == 4 * 2 * 8  # one (d, v) level: the four aspiration types
@@ -0,0 +1,38 @@
+# tests/test_trajectories.py
+import numpy as np
+
+from src.simulation import experiment_cells, run_experiment, run_single_simulation
+from src.trajectories import TrajectoryStore
+
+
+def test_recorded_periods_round_trip(tmp_path):
+    cells = experiment_cells()[:2]
+    store = TrajectoryStore.create(tmp_path, cells, n_runs=2, n_firms=5, n_periods=150, every=2,
+                                   dtype="float64")
+    records = {}
+    for c, (_, _, d, v, asp) in enumerate(cells):
+        for run in range(2):
+            *_, records[c, run] = run_single_simulation(asp, d, v, n_firms=5, n_periods=150,
+                                                        return_trajectory=True, rng=np.random.default_rng(run),
+                                                        recorder=store.recorder(c, run))
+    reopened = TrajectoryStore.open(tmp_path)
+    performance = reopened.arrays["performance"]
+    assert performance.shape == (2, 2, 75, 5)  # more stored periods than one write block
+    for (c, run), perf in records.items():
+        np.testing.assert_array_equal(performance[c, run], perf[::2])
+
+    means = reopened.period_means("performance")
+    np.testing.assert_allclose(means["performance"], np.asarray(performance).mean(axis=(1, 3)).ravel())
+    np.testing.assert_array_equal(means["Period"].iloc[:75], np.arange(0, 150, 2))
+    median = reopened.period_quantiles("performance", q=(0.5,), chunk_elements=30)["q0.5"]
+    expected = np.median(np.asarray(performance).transpose(0, 2, 1, 3).reshape(2, 75, -1), axis=2)
+    np.testing.assert_allclose(median, expected.ravel())
+
+
+def test_process_pool_records_the_same_store(tmp_path):
+    small = dict(n_firms=6, n_periods=12, strategy="stepwise", n_runs=2, trajectory_every=3, seed=1)
+    run_experiment(**small, trajectory_dir=tmp_path / "inline")
+    run_experiment(**small, trajectory_dir=tmp_path / "pool", workers=2)
+    inline, pool = (TrajectoryStore.open(tmp_path / name) for name in ("inline", "pool"))
+    for field in inline.arrays:
+        np.testing.assert_array_equal(inline.arrays[field], pool.arrays[field])